@@ -1,15 +1,270 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
-from database import DatabaseManager, Course, Grade, Student
+from flask import (
+    Flask,
+    Response,
+    g,
+    render_template,
+    request,
+    jsonify,
+    session,
+    redirect,
+    stream_with_context,
+    url_for,
+)
+from comment_writer import init_comment_writer
+from compression import init_compression
+from database import (
+    DatabaseManager,
+    Course,
+    Student,
+    EXPORT_COLUMNS,
+    grade_source,
+)
+from json_provider import init_json_provider
+from metrics import init_metrics
 from datetime import datetime, timedelta
+import base64
+import csv
+import functools
+import hashlib
+import io
+import json
+import os
+import time
 import uuid
 
 
 app = Flask(__name__)
-app.secret_key = uuid.uuid4().hex  # 使用随机生成的密钥
+# 多进程部署时需通过SECRET_KEY共用同一密钥，未设置时使用随机生成的密钥
+app.secret_key = os.getenv("SECRET_KEY") or uuid.uuid4().hex
+# 安装了 orjson 时使用更快的JSON序列化
+init_json_provider(app)
+# 较大的JSON/文本响应按 Accept-Encoding 压缩
+init_compression(app)
 
 
 # 初始化数据库
 db = DatabaseManager()
+# 请求延迟、每请求SQL统计和慢查询日志，/metrics 输出
+init_metrics(app, *db.engines)
+# 启用 COMMENT_WRITE_BEHIND 时留言由后台线程批量写入
+comment_writer = init_comment_writer(db)
+
+
+@app.before_request
+def read_primary_after_write():
+    """用户刚写入过数据时读主库，避免副本复制延迟导致读不到自己的写入"""
+    if db.replicas and session.get("primary_until", 0) > time.time():
+        db.use_primary()
+
+
+@app.after_request
+def remember_write(response):
+    if db.replicas and db.has_written():
+        session["primary_until"] = time.time() + db.replica_sticky_seconds
+    return response
+
+
+@app.teardown_appcontext
+def remove_db_session(exception=None):
+    """请求结束后释放数据库会话"""
+    db.remove_session()
+
+
+# 列表接口分页大小
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(value):
+    """把分页位置编码为不透明的游标字符串"""
+    if value is None:
+        return None
+    raw = json.dumps(value, ensure_ascii=False).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    """解析游标字符串，格式不正确时抛出ValueError"""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        return json.loads(raw)
+    except Exception:
+        raise ValueError("invalid cursor")
+
+
+def page_args(key_type):
+    """从请求参数中读取(游标, 每页条数)；游标须与分页主键同类型，否则抛出ValueError"""
+    limit = request.args.get("limit", DEFAULT_PAGE_SIZE, type=int)
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    after = decode_cursor(request.args.get("cursor"))
+    # bool 是 int 的子类，需单独排除
+    if after is not None and (
+        not isinstance(after, key_type) or isinstance(after, bool)
+    ):
+        raise ValueError("invalid cursor")
+    return after, limit
+
+
+def include_archive_arg(args):
+    """请求参数 include_archive=1 时成绩查询包含已归档的学期"""
+    return args.get("include_archive", "").lower() in ("1", "true", "yes")
+
+
+def course_stat_fields(row):
+    """由课程汇总列得到选课人数、已出成绩人数、平均分和及格率"""
+    graded = row.graded or 0
+    return {
+        "enrolled": row.enrolled or 0,
+        "graded": graded,
+        "average": round(row.grade_sum / graded, 2) if graded else None,
+        "pass_rate": round(row.pass_count / graded, 4) if graded else None,
+    }
+
+
+def make_etag(versions, user_session, full_path):
+    """由表版本号生成ETag；同一接口的返回内容还取决于登录用户和查询参数"""
+    key = [versions, user_session.get("user_type"), user_session.get("user_id")]
+    key.append(full_path)
+    raw = json.dumps(key, ensure_ascii=False).encode()
+    return hashlib.sha1(raw).hexdigest()[:20]
+
+
+def set_revalidate(response, etag):
+    """设置弱ETag，浏览器每次都带If-None-Match重新验证"""
+    response.set_etag(etag, weak=True)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    response.vary.add("Cookie")
+    return response
+
+
+def conditional_get(*tables):
+    """按表版本号生成弱ETag，客户端缓存仍有效时返回304，不查询数据表；
+    版本号来自数据库，视图使用进程内缓存时须用 table_version 校验缓存条目，
+    否则其它进程写入后本进程的旧缓存会以新版本号的ETag返回。
+    asgi.py 中有对应的异步版本"""
+
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            # 先读版本号再读数据：期间若有写入，返回的ETag对应旧版本号，
+            # 下次请求时不会命中，不会把新数据当作旧数据缓存
+            versions = db.get_table_versions(tables)
+            if versions is None:
+                return view(*args, **kwargs)
+            g.table_versions = dict(zip(tables, versions))
+            etag = make_etag(versions, session, request.full_path)
+            if request.if_none_match.contains_weak(etag):
+                response = Response(status=304)
+            else:
+                response = app.make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            return set_revalidate(response, etag)
+
+        return wrapper
+
+    return decorator
+
+
+def table_version(*tables):
+    """conditional_get 读到的表版本号，用于校验进程内缓存条目；未读到时返回None"""
+    versions = g.get("table_versions")
+    if versions is None:
+        return None
+    return tuple(versions[table] for table in tables)
+
+
+# 以下登录和返回数据的组装与 asgi.py 中的异步接口共用，两边返回相同的内容
+
+# 各身份的登录方法（DatabaseManager 与 AsyncDatabaseManager 同名）及账号字段
+LOGIN_TYPES = {
+    "admin": ("admin_login", "ano"),
+    "teacher": ("teacher_login", "tno"),
+    "student": ("student_login", "sno"),
+}
+
+
+def read_login(data):
+    """读取登录请求中的(身份, 账号, 密码)；账号或密码为空时返回None"""
+    user_id = data.get("user_id", "").strip()
+    password = data.get("password", "").strip()
+    if not user_id or not password:
+        return None
+    return data.get("user_type"), user_id, password
+
+
+def login_user(user_session, user_type, user):
+    """登录成功后写入会话，返回响应内容"""
+    user_session["user_type"] = user_type
+    user_session["user_id"] = getattr(user, LOGIN_TYPES[user_type][1])
+    return {"success": True, "user_type": user_type}
+
+
+def student_fields(student):
+    return {
+        "sno": student.sno,
+        "sname": student.sname,
+        "smajor": student.smajor,
+        "sclass": student.sclass,
+        "sex": student.sex,
+        "birthday": student.birthday,
+    }
+
+
+def teacher_fields(teacher):
+    return {
+        "tno": teacher.tno,  # 工号
+        "tname": teacher.tname,  # 姓名
+        "tdept": teacher.tdept,  # 院系
+    }
+
+
+def grade_fields(grade):
+    return {
+        "sno": grade.sno,  # 学号
+        "cname": grade.cname,  # 课程名称
+        "cno": grade.cno,  # 课程编号
+        "term": grade.term,  # 学期
+        "grade": grade.grade,  # 成绩
+    }
+
+
+def comment_page_args(args):
+    """读取留言列表的(每页条数, 偏移, 游标)；参数格式不正确时抛出ValueError。
+    每页条数与列表接口一样限制在 1..MAX_PAGE_SIZE"""
+    limit = max(1, min(int(args.get("limit", 5)), MAX_PAGE_SIZE))
+    offset = max(0, int(args.get("offset", 0)))
+    before = None
+    if args.get("before"):
+        try:
+            timestamp, comment_id = decode_cursor(args["before"])
+            before = (datetime.fromisoformat(timestamp), int(comment_id))
+        except TypeError:
+            raise ValueError("invalid cursor")
+    return limit, offset, before
+
+
+def comments_page(comments, limit):
+    comments_data = []
+    for comment in comments:
+        comments_data.append(
+            {
+                "name": comment.name,
+                "content": comment.content,
+                "timestamp": comment.timestamp.strftime("%Y-%m-%d %H:%M:%S"),
+            }
+        )
+
+    # 下一页游标：本页最后一条留言的(时间戳, id)
+    next_before = None
+    if comments and len(comments) == limit:
+        last = comments[-1]
+        next_before = encode_cursor([last.timestamp.isoformat(), last.id])
+
+    return {"comments": comments_data, "next_before": next_before}
 
 
 def is_valid_input(string):
@@ -34,30 +289,14 @@ def login_page():
 @app.route("/api/login", methods=["POST"])
 def api_login():
     """用户登录API"""
-    data = request.get_json()
-    user_type = data.get("user_type")  # 'admin', 'teacher', 'student'
-    user_id = data.get("user_id", "").strip()
-    password = data.get("password", "").strip()
-    if not user_id or not password:
+    credentials = read_login(request.get_json())
+    if credentials is None:
         return jsonify({"success": False, "message": "账号和密码不能为空"})
-    if user_type == "admin":
-        success, user = db.admin_login(user_id, password)
-        if success:
-            session["user_type"] = "admin"
-            session["user_id"] = user.ano
-            return jsonify({"success": True, "user_type": "admin"})
-    elif user_type == "teacher":
-        success, user = db.teacher_login(user_id, password)
-        if success:
-            session["user_type"] = "teacher"
-            session["user_id"] = user.tno
-            return jsonify({"success": True, "user_type": "teacher"})
-    elif user_type == "student":
-        success, user = db.student_login(user_id, password)
+    user_type, user_id, password = credentials  # 'admin', 'teacher', 'student'
+    if user_type in LOGIN_TYPES:
+        success, user = getattr(db, LOGIN_TYPES[user_type][0])(user_id, password)
         if success:
-            session["user_type"] = "student"
-            session["user_id"] = user.sno
-            return jsonify({"success": True, "user_type": "student"})
+            return jsonify(login_user(session, user_type, user))
     return jsonify({"success": False, "message": "账号或密码错误"})
 
 
@@ -77,6 +316,7 @@ def dashboard():
 
 
 @app.route("/api/student/courses", methods=["GET"])
+@conditional_get("courses", "grades")
 def student_get_courses():
     """查询学生已修课程及学分"""
     if "user_id" not in session or session.get("user_type") != "student":
@@ -84,13 +324,14 @@ def student_get_courses():
 
     sno = session.get("user_id")  # 学生学号
 
+    G = grade_source(include_archive_arg(request.args))
     # Get all courses and the corresponding grades for this student
     courses = (
-        db.session.query(
-            Course.cno, Course.cname, Course.credit, Grade.grade, Course.term
+        db.read_session.query(
+            Course.cno, Course.cname, Course.credit, G.grade, Course.term
         )
-        .join(Grade, Grade.cno == Course.cno)
-        .filter(Grade.sno == sno)
+        .join(G, G.cno == Course.cno)
+        .filter(G.sno == sno)
         .all()
     )
 
@@ -120,12 +361,11 @@ def api_teacher_students():
         return jsonify({"success": False, "message": "请提供课程名称"})
 
     # 验证教师是否教授该课程
-    sno = session.get("user_id")
-    teacher = db.get_teacher_info(sno)
-    if not teacher or teacher.cname != course_name:
+    course = db.read_session.query(Course).filter_by(cname=course_name).first()
+    if not course or course.tno != session.get("user_id"):
         return jsonify({"success": False, "message": "您未教授该课程"})
 
-    students = db.get_students_by_course(course_name)
+    students = db.get_students_by_course(course.cno)
     students_data = []
     for student in students:
         students_data.append(
@@ -134,6 +374,7 @@ def api_teacher_students():
                 "sname": student.sname,
                 "smajor": student.smajor,
                 "cname": student.cname,
+                "term": student.term,
                 "igrade": student.igrade,
             }
         )
@@ -164,6 +405,37 @@ def teacher_add_grade():
     return jsonify({"success": success, "message": message})
 
 
+@app.route("/api/teacher/add_grades", methods=["POST"])
+def teacher_add_grades():
+    """批量录入一门课程一个学期的成绩"""
+    if "user_id" not in session or session.get("user_type") != "teacher":
+        return jsonify({"success": False, "message": "权限不足"})
+    data = request.get_json()
+    course_no = data.get("course_no")
+    term = data.get("term")
+    grades = data.get("grades")
+    if not all([course_no, term]) or not isinstance(grades, list):
+        return jsonify({"success": False, "message": "参数不完整"})
+    if not isinstance(course_no, str) or not isinstance(term, str):
+        return jsonify({"success": False, "message": "参数格式错误"})
+    course = db.get_course(course_no)
+    if not course:
+        return jsonify({"success": False, "message": "课程不存在"})
+    if course.tno != session.get("user_id"):
+        return jsonify({"success": False, "message": "您未教授该课程"})
+    items = [
+        {"sno": g.get("student_sno"), "grade": g.get("grade")}
+        for g in grades
+        if isinstance(g, dict)
+    ]
+    if len(items) != len(grades):
+        return jsonify({"success": False, "message": "参数格式错误"})
+    success, result = db.add_grades(course_no, term, items)
+    if not success:
+        return jsonify({"success": False, "message": result})
+    return jsonify({"success": True, "message": "成绩录入完成", **result})
+
+
 @app.route("/api/teacher/update_grade", methods=["POST"])
 def teacher_update_grade():
     if "user_id" not in session or session.get("user_type") != "teacher":
@@ -228,29 +500,24 @@ def api_comments():
         if len(name) > 50 or len(content) > 500:
             return jsonify({"error": "内容过长"}), 400
 
-        success, message = db.add_comment(name, content)
+        success, message = (comment_writer or db).add_comment(name, content)
         if success:
             session["last_comment_time"] = datetime.now().isoformat()
             return jsonify({"success": True})
+        elif comment_writer:
+            # 写入队列已满，提示客户端稍后重试
+            return jsonify({"error": message}), 503, {"Retry-After": "1"}
         else:
             return jsonify({"error": message}), 500
 
     else:  # GET
-        limit = int(request.args.get("limit", 5))
-        offset = int(request.args.get("offset", 0))
+        try:
+            limit, offset, before = comment_page_args(request.args)
+        except ValueError:
+            return jsonify({"error": "分页参数错误"}), 400
 
-        comments = db.get_comments(limit, offset)
-        comments_data = []
-        for comment in comments:
-            comments_data.append(
-                {
-                    "name": comment.name,
-                    "content": comment.content,
-                    "timestamp": comment.timestamp.strftime("%Y-%m-%d %H:%M:%S"),
-                }
-            )
-
-        return jsonify({"comments": comments_data})
+        comments = db.get_comments(limit, offset, before)
+        return jsonify(comments_page(comments, limit))
 
 
 @app.route("/api/comments/count")
@@ -284,6 +551,32 @@ def admin_add_student():
     return jsonify({"success": success, "message": msg})
 
 
+def read_csv_upload():
+    """读取上传的CSV文件，返回字典列表；文件缺失或编码错误时返回None"""
+    upload = request.files.get("file")
+    if not upload:
+        return None
+    try:
+        text = upload.read().decode("utf-8-sig")
+    except UnicodeDecodeError:
+        return None
+    return list(csv.DictReader(io.StringIO(text)))
+
+
+@app.route("/api/admin/import_students", methods=["POST"])
+def admin_import_students():
+    """从CSV批量导入学生，列：sno,sname,smajor,sclass,sex,birthday[,password]"""
+    if session.get("user_type") != "admin":
+        return jsonify({"success": False, "message": "无权限"})
+    rows = read_csv_upload()
+    if rows is None:
+        return jsonify({"success": False, "message": "请上传UTF-8编码的CSV文件"})
+    success, result = db.bulk_add_students(rows)
+    if not success:
+        return jsonify({"success": False, "message": result})
+    return jsonify({"success": True, "message": "导入完成", **result})
+
+
 @app.route("/api/admin/update_student", methods=["POST"])
 def admin_update_student():
     if session.get("user_type") != "admin":
@@ -306,13 +599,19 @@ def admin_delete_student():
 
 
 @app.route("/api/admin/get_students")
+@conditional_get("students")
 def admin_get_students():
     if session.get("user_type") != "admin":
         return jsonify({"success": False, "message": "无权限"})
-    students = db.get_all_students()
+    try:
+        after, limit = page_args(str)
+    except ValueError:
+        return jsonify({"success": False, "message": "分页参数错误"}), 400
+    students, next_key = db.get_students_page(after, limit)
     return jsonify(
         {
             "success": True,
+            "next_cursor": encode_cursor(next_key),
             "students": [
                 {
                     "sno": s.sno,
@@ -341,6 +640,20 @@ def admin_add_teacher():
     return jsonify({"success": success, "message": msg})
 
 
+@app.route("/api/admin/import_teachers", methods=["POST"])
+def admin_import_teachers():
+    """从CSV批量导入教师，列：tno,tname,tdept[,password]"""
+    if session.get("user_type") != "admin":
+        return jsonify({"success": False, "message": "无权限"})
+    rows = read_csv_upload()
+    if rows is None:
+        return jsonify({"success": False, "message": "请上传UTF-8编码的CSV文件"})
+    success, result = db.bulk_add_teachers(rows)
+    if not success:
+        return jsonify({"success": False, "message": result})
+    return jsonify({"success": True, "message": "导入完成", **result})
+
+
 @app.route("/api/admin/update_teacher", methods=["POST"])
 def admin_update_teacher():
     if session.get("user_type") != "admin":
@@ -363,13 +676,19 @@ def admin_delete_teacher():
 
 
 @app.route("/api/admin/get_teachers")
+@conditional_get("teachers")
 def admin_get_teachers():
     if session.get("user_type") != "admin":
         return jsonify({"success": False, "message": "无权限"})
-    teachers = db.get_all_teachers()
+    try:
+        after, limit = page_args(str)
+    except ValueError:
+        return jsonify({"success": False, "message": "分页参数错误"}), 400
+    teachers, next_key = db.get_teachers_page(after, limit)
     return jsonify(
         {
             "success": True,
+            "next_cursor": encode_cursor(next_key),
             "teachers": [
                 {"tno": t.tno, "tname": t.tname, "tdept": t.tdept} for t in teachers
             ],
@@ -413,13 +732,19 @@ def admin_delete_course():
 
 
 @app.route("/api/admin/get_courses")
+@conditional_get("courses", "grades")
 def admin_get_courses():
     if session.get("user_type") != "admin":
         return jsonify({"success": False, "message": "无权限"})
-    courses = db.get_all_courses()
+    try:
+        after, limit = page_args(str)
+    except ValueError:
+        return jsonify({"success": False, "message": "分页参数错误"}), 400
+    courses, next_key = db.get_courses_page(after, limit)
     return jsonify(
         {
             "success": True,
+            "next_cursor": encode_cursor(next_key),
             "courses": [
                 {
                     "cno": c.cno,
@@ -427,6 +752,7 @@ def admin_get_courses():
                     "credit": c.credit,
                     "tno": c.tno,
                     "term": c.term,
+                    **course_stat_fields(c),
                 }
                 for c in courses
             ],
@@ -435,13 +761,26 @@ def admin_get_courses():
 
 
 @app.route("/api/admin/get_grades")
+@conditional_get("grades")
 def admin_get_grades():
     if session.get("user_type") != "admin":
         return jsonify({"success": False, "message": "无权限"})
-    grades = db.get_all_grades()
+    try:
+        after, limit = page_args(int)
+    except ValueError:
+        return jsonify({"success": False, "message": "分页参数错误"}), 400
+    grades, next_key = db.get_grades_page(
+        after,
+        limit,
+        sno=request.args.get("sno"),
+        cno=request.args.get("cno"),
+        term=request.args.get("term"),
+        include_archive=include_archive_arg(request.args),
+    )
     return jsonify(
         {
             "success": True,
+            "next_cursor": encode_cursor(next_key),
             "grades": [
                 {
                     "id": g.id,
@@ -456,6 +795,62 @@ def admin_get_grades():
     )
 
 
+# 导出时每次向客户端发送的行数
+EXPORT_CHUNK_ROWS = 1000
+
+
+def export_csv(columns, rows):
+    """逐块生成CSV文本"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # 带BOM，Excel打开中文不乱码
+    buffer.write("\ufeff")
+    writer.writerow(columns)
+    for i, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if i % EXPORT_CHUNK_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def export_ndjson(columns, rows):
+    """逐块生成NDJSON文本，每行一个JSON对象"""
+    chunk = []
+    for row in rows:
+        chunk.append(json.dumps(dict(zip(columns, row)), ensure_ascii=False))
+        if len(chunk) == EXPORT_CHUNK_ROWS:
+            yield "\n".join(chunk) + "\n"
+            chunk = []
+    if chunk:
+        yield "\n".join(chunk) + "\n"
+
+
+@app.route("/api/admin/export/<table>")
+def admin_export(table):
+    """流式导出学生、课程或成绩表，format=csv|ndjson"""
+    if session.get("user_type") != "admin":
+        return jsonify({"success": False, "message": "无权限"})
+    if table not in EXPORT_COLUMNS:
+        return jsonify({"success": False, "message": "不支持导出该表"})
+    fmt = request.args.get("format", "csv")
+    if fmt not in ("csv", "ndjson"):
+        return jsonify({"success": False, "message": "不支持的导出格式"})
+
+    columns = [c.key for c in EXPORT_COLUMNS[table]]
+    rows = db.iter_export(table, batch_size=EXPORT_CHUNK_ROWS)
+    if fmt == "csv":
+        body, mimetype = export_csv(columns, rows), "text/csv"
+    else:
+        body, mimetype = export_ndjson(columns, rows), "application/x-ndjson"
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename={table}.{fmt}"},
+    )
+
+
 @app.route("/api/admin/change_password", methods=["POST"])
 def admin_change_password():
     if session.get("user_type") != "admin":
@@ -463,13 +858,21 @@ def admin_change_password():
     data = request.get_json()
     old_password = data.get("old_password")
     new_password = data.get("new_password")
-    admin = db.get_admin(session["user_id"])
-    if not db.verify_password(old_password, admin.password):
+    success, admin = db.admin_login(session["user_id"], old_password)
+    if not success:
         return jsonify({"success": False, "message": "原密码错误"})
     success, msg = db.update_admin(admin.ano, password=new_password)
     return jsonify({"success": success, "message": msg})
 
 
+@app.route("/api/admin/cache_stats")
+def admin_cache_stats():
+    """查看缓存命中情况"""
+    if session.get("user_type") != "admin":
+        return jsonify({"success": False, "message": "无权限"})
+    return jsonify({"success": True, "caches": db.cache_stats()})
+
+
 # ---------------- 管理员账号管理API ----------------
 @app.route("/api/admin/add_admin", methods=["POST"])
 def admin_add_admin():
@@ -506,6 +909,7 @@ def admin_delete_admin():
 
 
 @app.route("/api/admin/get_admins")
+@conditional_get("admins")
 def admin_get_admins():
     if session.get("user_type") != "admin":
         return jsonify({"success": False, "message": "无权限"})
@@ -538,34 +942,30 @@ def teacher_enter_grade():
         return jsonify({"success": False, "message": "成绩必须是数字"})
 
     # 验证教师权限
-    teacher_sno = session.get("user_id")
-    teacher = db.get_teacher_info(teacher_sno)
-    if not teacher or teacher.cname != course_name:
+    course = db.session.query(Course).filter_by(cname=course_name).first()
+    if not course or course.tno != session.get("user_id"):
         return jsonify({"success": False, "message": "您未教授该课程"})
 
-    success, message = db.update_student_grade(student_sno, course_name, grade)
+    # 未指定学期时使用课程的开课学期
+    term = data.get("term") or course.term
+    success, message = db.update_student_grade(student_sno, course.cno, term, grade)
     return jsonify({"success": success, "message": message})
 
 
 @app.route("/api/teacher/get_info", methods=["GET"])
+@conditional_get("teachers")
 def teacher_get_info():
     """查询教师个人信息"""
     if "user_id" not in session or session.get("user_type") != "teacher":
         return jsonify({"success": False, "message": "权限不足"})
 
     teacher_sno = session.get("user_id")
-    teacher_info = db.get_teacher(teacher_sno)
+    teacher_info = db.get_teacher(teacher_sno, version=table_version("teachers"))
 
     if not teacher_info:
         return jsonify({"success": False, "message": "教师不存在"})
 
-    teacher_data = {
-        "tno": teacher_info.tno,  # 工号
-        "tname": teacher_info.tname,  # 姓名
-        "tdept": teacher_info.tdept,  # 院系
-    }
-
-    return jsonify({"success": True, "teacher": teacher_data})
+    return jsonify({"success": True, "teacher": teacher_fields(teacher_info)})
 
 
 @app.route("/api/teacher/update_info", methods=["POST"])
@@ -612,14 +1012,15 @@ def teacher_change_password():
     data = request.get_json()
     old_password = data.get("old_password")
     new_password = data.get("new_password")
-    teacher = db.get_teacher(session["user_id"])
-    if not db.verify_password(old_password, teacher.password):
+    success, teacher = db.teacher_login(session["user_id"], old_password)
+    if not success:
         return jsonify({"success": False, "message": "原密码错误"})
     success, msg = db.update_teacher(teacher.tno, password=new_password)
     return jsonify({"success": success, "message": msg})
 
 
 @app.route("/api/teacher/grades", methods=["GET"])
+@conditional_get("courses", "grades", "students")
 def teacher_get_grades():
     """查询教师已录入的成绩"""
     if "user_id" not in session or session.get("user_type") != "teacher":
@@ -633,7 +1034,7 @@ def teacher_get_grades():
     db.get_teacher(teacher_sno)
 
     # 根据课程名称获取课程编号
-    course = db.session.query(Course).filter_by(cname=course_name).first()
+    course = db.read_session.query(Course).filter_by(cname=course_name).first()
 
     if not course:
         return jsonify({"success": False, "message": "课程不存在"})
@@ -642,17 +1043,18 @@ def teacher_get_grades():
     if course.tno != teacher_sno:
         return jsonify({"success": False, "message": "您未教授该课程"})
 
+    G = grade_source(include_archive_arg(request.args))
     # 查询成绩并连接学生表以获取学生姓名
     grades = (
-        db.session.query(Grade, Student.sname)
-        .join(Student, Grade.sno == Student.sno)
-        .filter(Grade.cno == course.cno)
+        db.read_session.query(G.sno, Student.sname, G.grade, G.term)
+        .join(Student, G.sno == Student.sno)
+        .filter(G.cno == course.cno)
     )
 
     if term:
-        grades = grades.filter(Grade.term == term)
+        grades = grades.filter(G.term == term)
     if student_sno:
-        grades = grades.filter(Grade.sno == student_sno)
+        grades = grades.filter(G.sno == student_sno)
 
     grades = grades.all()
 
@@ -660,12 +1062,12 @@ def teacher_get_grades():
         return jsonify({"success": False, "message": "没有成绩记录"})
 
     grades_data = []
-    for grade, sname in grades:
+    for grade in grades:
         grades_data.append(
             {
                 "sno": grade.sno,  # 学生学号
-                "sname": sname,  # 学生姓名
-                "course_name": grade.course.cname,  # 课程名称
+                "sname": grade.sname,  # 学生姓名
+                "course_name": course.cname,  # 课程名称
                 "grade": grade.grade,  # 成绩
                 "term": grade.term,  # 学期
             }
@@ -674,6 +1076,86 @@ def teacher_get_grades():
     return jsonify({"success": True, "grades": grades_data})
 
 
+@app.route("/api/teacher/get_grades", methods=["GET"])
+@conditional_get("courses", "grades", "students")
+def teacher_list_grades():
+    """分页查询教师所授课程的成绩，可按学期、课程编号、学号过滤"""
+    if "user_id" not in session or session.get("user_type") != "teacher":
+        return jsonify({"success": False, "message": "权限不足"})
+    try:
+        after, limit = page_args(int)
+    except ValueError:
+        return jsonify({"success": False, "message": "分页参数错误"}), 400
+    grades, next_key = db.get_teacher_grades_page(
+        session.get("user_id"),
+        after,
+        limit,
+        term=request.args.get("term"),
+        cno=request.args.get("course_no"),
+        sno=request.args.get("student_sno"),
+        include_archive=include_archive_arg(request.args),
+    )
+    return jsonify(
+        {
+            "success": True,
+            "next_cursor": encode_cursor(next_key),
+            "grades": [
+                {
+                    "id": g.id,
+                    "sno": g.sno,
+                    "sname": g.sname,
+                    "cno": g.cno,
+                    "cname": g.cname,
+                    "term": g.term,
+                    "grade": g.grade,
+                }
+                for g in grades
+            ],
+        }
+    )
+
+
+@app.route("/api/teacher/course_stats", methods=["GET"])
+@conditional_get("courses", "grades")
+def teacher_course_stats():
+    """课程成绩统计；不指定课程编号时返回该教师所有课程"""
+    if "user_id" not in session or session.get("user_type") != "teacher":
+        return jsonify({"success": False, "message": "权限不足"})
+
+    stats = db.get_course_stats(
+        session.get("user_id"),
+        cno=request.args.get("course_no"),
+        term=request.args.get("term"),
+        include_archive=include_archive_arg(request.args),
+    )
+    return jsonify({"success": True, "stats": stats})
+
+
+@app.route("/api/teacher/get_courses", methods=["GET"])
+@conditional_get("courses", "grades")
+def teacher_get_courses():
+    """教师名下的课程及选课人数、平均分、及格率"""
+    if "user_id" not in session or session.get("user_type") != "teacher":
+        return jsonify({"success": False, "message": "权限不足"})
+
+    courses = db.get_courses_by_teacher(session.get("user_id"))
+    return jsonify(
+        {
+            "success": True,
+            "courses": [
+                {
+                    "cno": c.cno,
+                    "cname": c.cname,
+                    "credit": c.credit,
+                    "term": c.term,
+                    **course_stat_fields(c),
+                }
+                for c in courses
+            ],
+        }
+    )
+
+
 @app.route("/api/teacher/add_course", methods=["POST"])
 def teacher_add_course():
     if "user_id" not in session or session.get("user_type") != "teacher":
@@ -691,27 +1173,19 @@ def teacher_add_course():
 
 # ---------------- 学生相关API ----------------
 @app.route("/api/student/get_info", methods=["GET"])
+@conditional_get("students")
 def student_get_info():
     """获取学生信息API"""
     if "user_id" not in session or session.get("user_type") != "student":
         return jsonify({"success": False, "message": "权限不足"})
 
     sno = session.get("user_id")
-    student = db.get_student(sno)
+    student = db.get_student(sno, version=table_version("students"))
 
     if not student:
         return jsonify({"success": False, "message": "学生不存在"})
 
-    student_data = {
-        "sno": student.sno,
-        "sname": student.sname,
-        "smajor": student.smajor,
-        "sclass": student.sclass,
-        "sex": student.sex,
-        "birthday": student.birthday,
-    }
-
-    return jsonify({"success": True, "student": student_data})
+    return jsonify({"success": True, "student": student_fields(student)})
 
 
 @app.route("/api/student/update_info", methods=["POST"])
@@ -741,42 +1215,50 @@ def student_update_info():
 
 
 @app.route("/api/student/grades", methods=["GET"])
+@conditional_get("courses", "grades")
 def student_get_grades():
     """查询学生的成绩"""
     if "user_id" not in session or session.get("user_type") != "student":
         return jsonify({"success": False, "message": "权限不足"})
 
     sno = session.get("user_id")  # 学生学号
-    course_no = request.args.get("course_no")
-    term = request.args.get("term")
-
-    # 查询该学生的成绩，并连接课程表
-    grades_query = (
-        db.session.query(Grade, Course)
-        .join(Course, Grade.cno == Course.cno)
-        .filter(Grade.sno == sno)
+    grades = db.get_student_grades(
+        sno,
+        term=request.args.get("term"),
+        cno=request.args.get("course_no"),
+        include_archive=include_archive_arg(request.args),
     )
+    grades_data = [grade_fields(grade) for grade in grades]
+    return jsonify({"success": True, "grades": grades_data})
 
-    if course_no:
-        grades_query = grades_query.filter(Course.cno == course_no)
-    if term:
-        grades_query = grades_query.filter(Grade.term == term)
 
-    grades = grades_query.all()
+@app.route("/api/student/transcript", methods=["GET"])
+@conditional_get("courses", "grades")
+def student_get_transcript():
+    """查询学生成绩单：各科成绩及已获学分、加权平均分"""
+    if "user_id" not in session or session.get("user_type") != "student":
+        return jsonify({"success": False, "message": "权限不足"})
 
-    grades_data = []
-    for grade, course in grades:
-        grades_data.append(
-            {
-                "sno": grade.sno,  # 学号
-                "cname": course.cname,  # 课程名称
-                "cno": course.cno,  # 课程编号
-                "term": grade.term,  # 学期
-                "grade": grade.grade,  # 成绩
-            }
-        )
+    sno = session.get("user_id")
+    transcript = db.get_grades_by_student(
+        sno,
+        term=request.args.get("term"),
+        include_archive=include_archive_arg(request.args),
+    )
+    return jsonify({"success": True, **transcript})
 
-    return jsonify({"success": True, "grades": grades_data})
+
+@app.route("/api/student/summary", methods=["GET"])
+@conditional_get("courses", "grades")
+def student_get_summary():
+    """查询学生学分及绩点汇总（总体及各学期）"""
+    if "user_id" not in session or session.get("user_type") != "student":
+        return jsonify({"success": False, "message": "权限不足"})
+
+    summary = db.get_student_summary(
+        session.get("user_id"), version=table_version("courses", "grades")
+    )
+    return jsonify({"success": True, "summary": summary})
 
 
 @app.route("/api/student/change_password", methods=["POST"])
@@ -786,8 +1268,8 @@ def student_change_password():
     data = request.get_json()
     old_password = data.get("old_password")
     new_password = data.get("new_password")
-    student = db.get_student(session["user_id"])
-    if not db.verify_password(old_password, student.password):
+    success, student = db.student_login(session["user_id"], old_password)
+    if not success:
         return jsonify({"success": False, "message": "原密码错误"})
     success, msg = db.update_student(student.sno, password=new_password)
     return jsonify({"success": success, "message": msg})
@@ -0,0 +1,183 @@
+"""
+ASGI 入口：登录、个人信息、成绩和留言板等高并发读接口由异步的 Quart 应用处理，
+其余接口转交同步的 Flask 应用（app.py），两者共用同一个会话 Cookie。
+
+运行：
+    hypercorn asgi:application --workers 2 --bind 0.0.0.0:8000
+"""
+
+from hypercorn.middleware import AsyncioWSGIMiddleware
+from quart import Quart, jsonify, request, session
+from app import (
+    LOGIN_TYPES,
+    app as flask_app,
+    comment_page_args,
+    comments_page,
+    grade_fields,
+    include_archive_arg,
+    login_user,
+    make_etag,
+    read_login,
+    set_revalidate,
+    student_fields,
+    teacher_fields,
+)
+from async_database import AsyncDatabaseManager
+from metrics import init_async_metrics
+import functools
+
+# 转交给同步应用的请求体大小上限（批量导入CSV需要较大的请求体）
+WSGI_MAX_BODY_SIZE = 16 * 1024 * 1024
+
+quart_app = Quart(__name__)
+# 与 Flask 应用使用同一个密钥，登录状态在两边通用
+quart_app.secret_key = flask_app.secret_key
+
+db = AsyncDatabaseManager()
+# 请求指标与 Flask 应用记入同一组，由 Flask 应用的 /metrics 输出
+init_async_metrics(quart_app, *db.engines)
+
+
+@quart_app.after_serving
+async def close_db():
+    await db.close()
+
+
+def conditional_get(*tables):
+    """app.conditional_get 的异步版本，ETag 的生成和响应头与之相同"""
+
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapper(*args, **kwargs):
+            versions = await db.get_table_versions(tables)
+            if versions is None:
+                return await view(*args, **kwargs)
+            etag = make_etag(versions, session, request.full_path)
+            if request.if_none_match.contains_weak(etag):
+                response = quart_app.response_class("", status=304)
+            else:
+                response = await quart_app.make_response(await view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            return set_revalidate(response, etag)
+
+        return wrapper
+
+    return decorator
+
+
+# 以下接口与 app.py 中的同名接口一一对应，登录、ETag和返回数据的组装共用 app.py 中的实现，
+# 修改时两边需同步；benchmarks/asgi_parity.py 检查两边的返回是否一致
+
+
+@quart_app.route("/api/login", methods=["POST"])
+async def api_login():
+    """用户登录API"""
+    credentials = read_login(await request.get_json())
+    if credentials is None:
+        return jsonify({"success": False, "message": "账号和密码不能为空"})
+    user_type, user_id, password = credentials
+    if user_type in LOGIN_TYPES:
+        success, user = await getattr(db, LOGIN_TYPES[user_type][0])(user_id, password)
+        if success:
+            return jsonify(login_user(session, user_type, user))
+    return jsonify({"success": False, "message": "账号或密码错误"})
+
+
+@quart_app.route("/api/student/get_info", methods=["GET"])
+@conditional_get("students")
+async def student_get_info():
+    """获取学生信息API"""
+    if "user_id" not in session or session.get("user_type") != "student":
+        return jsonify({"success": False, "message": "权限不足"})
+
+    student = await db.get_student(session.get("user_id"))
+    if not student:
+        return jsonify({"success": False, "message": "学生不存在"})
+
+    return jsonify({"success": True, "student": student_fields(student)})
+
+
+@quart_app.route("/api/student/grades", methods=["GET"])
+@conditional_get("courses", "grades")
+async def student_get_grades():
+    """查询学生的成绩"""
+    if "user_id" not in session or session.get("user_type") != "student":
+        return jsonify({"success": False, "message": "权限不足"})
+
+    grades = await db.get_student_grades(
+        session.get("user_id"),
+        term=request.args.get("term"),
+        cno=request.args.get("course_no"),
+        include_archive=include_archive_arg(request.args),
+    )
+    grades_data = [grade_fields(grade) for grade in grades]
+    return jsonify({"success": True, "grades": grades_data})
+
+
+@quart_app.route("/api/student/transcript", methods=["GET"])
+@conditional_get("courses", "grades")
+async def student_get_transcript():
+    """查询学生成绩单：各科成绩及已获学分、加权平均分"""
+    if "user_id" not in session or session.get("user_type") != "student":
+        return jsonify({"success": False, "message": "权限不足"})
+
+    transcript = await db.get_grades_by_student(
+        session.get("user_id"),
+        term=request.args.get("term"),
+        include_archive=include_archive_arg(request.args),
+    )
+    return jsonify({"success": True, **transcript})
+
+
+@quart_app.route("/api/teacher/get_info", methods=["GET"])
+@conditional_get("teachers")
+async def teacher_get_info():
+    """查询教师个人信息"""
+    if "user_id" not in session or session.get("user_type") != "teacher":
+        return jsonify({"success": False, "message": "权限不足"})
+
+    teacher = await db.get_teacher(session.get("user_id"))
+    if not teacher:
+        return jsonify({"success": False, "message": "教师不存在"})
+
+    return jsonify({"success": True, "teacher": teacher_fields(teacher)})
+
+
+@quart_app.route("/api/comments", methods=["GET"])
+async def api_comments():
+    """留言列表API；发表留言仍由同步应用处理"""
+    try:
+        limit, offset, before = comment_page_args(request.args)
+    except ValueError:
+        return jsonify({"error": "分页参数错误"}), 400
+
+    comments = await db.get_comments(limit, offset, before)
+    return jsonify(comments_page(comments, limit))
+
+
+@quart_app.route("/api/comments/count")
+async def api_comments_count():
+    """获取留言总数API"""
+    count = await db.get_comments_count()
+    return jsonify({"total": count})
+
+
+flask_asgi = AsyncioWSGIMiddleware(flask_app, max_body_size=WSGI_MAX_BODY_SIZE)
+# 由异步应用处理的 (路径, 方法)
+ASYNC_ROUTES = {
+    (rule.rule, method)
+    for rule in quart_app.url_map.iter_rules()
+    for method in rule.methods
+    if rule.endpoint != "static"
+}
+
+
+async def application(scope, receive, send):
+    """按路径和方法分发请求，生命周期事件交给异步应用"""
+    if scope["type"] == "lifespan" or (
+        scope["type"] == "http" and (scope["path"], scope["method"]) in ASYNC_ROUTES
+    ):
+        await quart_app(scope, receive, send)
+    else:
+        await flask_asgi(scope, receive, send)
@@ -0,0 +1,145 @@
+from sqlalchemy import func, select, and_, or_
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from database import (
+    Admin,
+    Comment,
+    Counter,
+    Course,
+    Student,
+    Teacher,
+    build_transcript,
+    conn_str,
+    pool_config,
+    student_grades_select,
+    transcript_select,
+    version_counter,
+)
+import hashlib
+
+# 同步驱动对应的异步驱动
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+    "mysql": "mysql+aiomysql",
+    "mysql+pymysql": "mysql+aiomysql",
+}
+
+
+# 把同步连接串换成对应的异步驱动，已是异步驱动的保持不变
+def to_async_url(database_url):
+    url = make_url(database_url)
+    driver = ASYNC_DRIVERS.get(url.drivername)
+    return url.set(drivername=driver) if driver else url
+
+
+# DatabaseManager 的异步版本，覆盖面板和留言板等高并发的读路径；
+# 表结构和写入管理仍由同步的 DatabaseManager / migrations.py 负责
+class AsyncDatabaseManager:
+    def __init__(self, database_url=conn_str, **pool_options):
+        options = {**pool_config, **pool_options}
+        options = {k: v for k, v in options.items() if v is not None}
+        self.engine = create_async_engine(to_async_url(database_url), **options)
+        # 每次调用使用独立的短会话，协程之间互不共享
+        self.session = async_sessionmaker(self.engine, expire_on_commit=False)
+
+    def hash_password(self, password):
+        return hashlib.sha256(password.encode()).hexdigest()
+
+    def verify_password(self, password, hashed):
+        return self.hash_password(password) == hashed
+
+    async def _get(self, model, key):
+        async with self.session() as session:
+            return await session.get(model, key)
+
+    # ---------------- 账号相关 ----------------
+    async def get_admin(self, ano):
+        return await self._get(Admin, ano)
+
+    async def get_student(self, sno):
+        return await self._get(Student, sno)
+
+    async def get_teacher(self, tno):
+        return await self._get(Teacher, tno)
+
+    async def get_course(self, cno):
+        return await self._get(Course, cno)
+
+    async def admin_login(self, ano, password):
+        return self._check_login(await self.get_admin(ano), password)
+
+    async def student_login(self, sno, password):
+        return self._check_login(await self.get_student(sno), password)
+
+    async def teacher_login(self, tno, password):
+        return self._check_login(await self.get_teacher(tno), password)
+
+    def _check_login(self, user, password):
+        if user and self.verify_password(password, user.password):
+            return True, user
+        return False, None
+
+    # ---------------- 成绩相关 ----------------
+    # 查询语句和成绩单结构与 DatabaseManager 共用
+    async def get_student_grades(self, sno, term=None, cno=None, include_archive=False):
+        query = student_grades_select(sno, term, cno, include_archive)
+        async with self.session() as session:
+            return (await session.execute(query)).all()
+
+    async def get_grades_by_student(
+        self, sno, term=None, cno=None, include_archive=False
+    ):
+        query = transcript_select(sno, term, cno, include_archive)
+        async with self.session() as session:
+            return build_transcript((await session.execute(query)).all())
+
+    # ---------------- 评论相关 ----------------
+    async def get_comments(self, limit=5, offset=0, before=None):
+        query = select(Comment).order_by(Comment.timestamp.desc(), Comment.id.desc())
+        if before:
+            timestamp, comment_id = before
+            query = query.where(
+                or_(
+                    Comment.timestamp < timestamp,
+                    and_(Comment.timestamp == timestamp, Comment.id < comment_id),
+                )
+            )
+        elif offset:
+            query = query.offset(offset)
+        try:
+            async with self.session() as session:
+                return (await session.scalars(query.limit(limit))).all()
+        except Exception:
+            return []
+
+    async def get_comments_count(self):
+        try:
+            async with self.session() as session:
+                counter = await session.get(Counter, "comments")
+                if counter:
+                    return counter.value
+                return await session.scalar(select(func.count(Comment.id)))
+        except Exception:
+            return 0
+
+    # ---------------- 缓存相关 ----------------
+    async def get_table_versions(self, tables):
+        # 与 DatabaseManager.get_table_versions 相同，供接口生成ETag
+        names = [version_counter(t) for t in tables]
+        query = select(Counter.name, Counter.value).where(Counter.name.in_(names))
+        async with self.session() as session:
+            rows = dict((await session.execute(query)).all())
+        if len(rows) != len(names):
+            return None
+        return [rows[name] for name in names]
+
+    @property
+    def engines(self):
+        # 注册SQL事件监听需使用同步 engine
+        return [self.engine.sync_engine]
+
+    async def close(self):
+        await self.engine.dispose()
@@ -0,0 +1,140 @@
+"""
+成绩归档检查：连续归档两个学期，两次归档之间录入新成绩，检查新成绩id不与归档成绩重复、
+第二次归档成功、含归档成绩的游标分页不重不漏；任一项不符合时以非零状态退出
+
+用法：
+    python benchmarks/archive.py
+
+分别在新建的SQLite库和按旧表结构（成绩表无 AUTOINCREMENT，版本6）建库后
+运行 migrations.py 升级的库上检查。
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import MetaData, create_engine, text  # noqa: E402
+
+from database import Base, DatabaseManager, Grade, SchemaVersion  # noqa: E402
+import migrations  # noqa: E402
+
+STUDENTS = [f"S{i:03d}" for i in range(3)]
+
+
+def report(name, passed):
+    print(f"{'ok' if passed else 'FAIL':<5} {name}")
+    return not passed
+
+
+def seed(db):
+    db.add_teacher("T001", "教师", "信息学院")
+    db.add_course("C000", "课程0", 2, "T001", "2023-1")
+    for i, sno in enumerate(STUDENTS):
+        db.add_student(sno, f"学生{i}", "计算机", "1班", "男", "2004-01-01")
+
+
+def add_term(db, term):
+    for i, sno in enumerate(STUDENTS):
+        db.add_grade(sno, "C000", term, 60 + i)
+    db.remove_session()
+
+
+def all_grade_ids(db, limit=2):
+    """按游标逐页读取含归档的全部成绩id"""
+    ids, after = [], None
+    while True:
+        rows, after = db.get_grades_page(after, limit, include_archive=True)
+        ids += [row.id for row in rows]
+        db.remove_session()
+        if after is None:
+            return ids
+
+
+def check_archive(db, name, archived_ids, total):
+    # archived_ids 为开始检查前已归档的成绩id，total 为检查结束时含归档的成绩总数
+    failed = 0
+    add_term(db, "2023-2")
+    new_ids = [g.id for g in db.read_session.query(Grade).filter_by(term="2023-2")]
+    db.remove_session()
+    failed += report(
+        f"{name}：归档后新成绩id不与归档成绩重复", not set(new_ids) & set(archived_ids)
+    )
+    success, result = db.archive_term("2023-2")
+    failed += report(f"{name}：再次归档成功", success and result["archived"] == 3)
+    add_term(db, "2024-1")
+    ids = all_grade_ids(db)
+    failed += report(
+        f"{name}：含归档成绩分页不重不漏", len(ids) == len(set(ids)) == total
+    )
+    return failed
+
+
+def check_fresh(directory):
+    db = DatabaseManager("sqlite:///" + os.path.join(directory, "fresh.db"))
+    seed(db)
+    add_term(db, "2023-1")
+    archived = [g.id for g in db.read_session.query(Grade)]
+    db.remove_session()
+    db.archive_term("2023-1")
+    failed = check_archive(db, "新建的库", archived, 9)
+    db.close()
+    return failed
+
+
+def check_upgraded(directory):
+    url = "sqlite:///" + os.path.join(directory, "upgraded.db")
+    db = DatabaseManager(url)
+    seed(db)
+    db.close()
+
+    # 按旧表结构重建成绩表，并退回到版本6
+    engine = create_engine(url)
+    metadata = MetaData()
+    for table in Base.metadata.sorted_tables:
+        table.to_metadata(metadata)
+    old_grades = metadata.tables["grades"]
+    old_grades.dialect_options["sqlite"]["autoincrement"] = False
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE grades"))
+        old_grades.create(conn)
+        conn.execute(SchemaVersion.__table__.delete())
+        conn.execute(
+            SchemaVersion.__table__.insert().values(version=6, description="旧表结构")
+        )
+
+    db = DatabaseManager(url, mode="skip")
+    # 升级前留一条当前成绩，检查重建成绩表时数据被保留
+    db.add_grade(STUDENTS[0], "C000", "2022-2", 90)
+    add_term(db, "2023-1")
+    archived = [g.id for g in db.read_session.query(Grade).filter_by(term="2023-1")]
+    db.remove_session()
+    db.archive_term("2023-1")
+    db.close()
+
+    applied = migrations.upgrade(engine)
+    failed = report("旧库升级到版本7", [n for n, _ in applied] == [7])
+    with engine.connect() as conn:
+        sql = conn.execute(
+            text("SELECT sql FROM sqlite_master WHERE name = 'grades'")
+        ).scalar()
+        kept = conn.execute(text("SELECT COUNT(*) FROM grades")).scalar()
+    engine.dispose()
+    failed += report("升级后成绩表使用 AUTOINCREMENT", "AUTOINCREMENT" in sql.upper())
+    failed += report("升级后保留原有成绩", kept == 1)
+
+    db = DatabaseManager(url, mode="skip")
+    failed += check_archive(db, "升级的库", archived, 10)
+    db.close()
+    return failed
+
+
+def main():
+    directory = tempfile.mkdtemp()
+    failed = check_fresh(directory) + check_upgraded(directory)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+ASGI 一致性检查：asgi.py 中由 Quart 处理的接口与 app.py 中的同名 Flask 接口
+对同样的请求应返回相同的状态码、JSON 和 ETag（不能是5xx），带 If-None-Match 时
+同样返回304，并记入请求指标；任一项不符合时以非零状态退出
+
+用法：
+    python benchmarks/asgi_parity.py
+
+在临时SQLite库中写入少量数据（含一个已归档的学期）后逐项比较；
+asgi.py 新增异步接口时需在 CASES 中登记，否则检查失败。
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PASSWORD = "123456"
+
+LOGINS = {
+    "admin": ("admin", PASSWORD),
+    "teacher": ("T001", PASSWORD),
+    "student": ("S001", PASSWORD),
+}
+
+
+def seed(db):
+    db.add_teacher("T001", "教师", "信息学院", PASSWORD)
+    db.add_course("C000", "课程0", 2, "T001", "2023-2")
+    db.add_course("C001", "课程1", 3, "T001", "2024-1")
+    for i in range(3):
+        sno = f"S{i:03d}"
+        db.add_student(sno, f"学生{i}", "计算机", "1班", "男", "2004-01-01", PASSWORD)
+        db.add_grade(sno, "C000", "2023-2", 70 + i)
+        db.add_grade(sno, "C001", "2024-1", 55 + i * 10)
+    db.archive_term("2023-2")
+    for i in range(7):
+        db.add_comment(f"访客{i}", f"留言{i}")
+    db.remove_session()
+
+
+def login_json(user_type, password=PASSWORD):
+    user_id = LOGINS[user_type][0]
+    return {"json": {"user_type": user_type, "user_id": user_id, "password": password}}
+
+
+# (方法, 路径, 登录身份, 请求参数)；登录身份为None时使用未登录的新客户端
+CASES = [
+    ("POST", "/api/login", None, login_json("student")),
+    ("POST", "/api/login", None, login_json("teacher")),
+    ("POST", "/api/login", None, login_json("student", "wrong")),
+    ("POST", "/api/login", None, {"json": {"user_type": "student", "user_id": ""}}),
+    (
+        "POST",
+        "/api/login",
+        None,
+        {"json": {"user_type": "guest", "user_id": "S001", "password": PASSWORD}},
+    ),
+    ("GET", "/api/student/get_info", "student", {}),
+    ("GET", "/api/student/get_info", "teacher", {}),
+    ("GET", "/api/student/grades", "student", {}),
+    ("GET", "/api/student/grades", "student", {"query_string": {"term": "2024-1"}}),
+    (
+        "GET",
+        "/api/student/grades",
+        "student",
+        {"query_string": {"course_no": "C000", "include_archive": "1"}},
+    ),
+    ("GET", "/api/student/grades", None, {}),
+    ("GET", "/api/student/transcript", "student", {}),
+    (
+        "GET",
+        "/api/student/transcript",
+        "student",
+        {"query_string": {"include_archive": "true"}},
+    ),
+    (
+        "GET",
+        "/api/student/transcript",
+        "student",
+        {"query_string": {"term": "2023-2", "include_archive": "1"}},
+    ),
+    ("GET", "/api/teacher/get_info", "teacher", {}),
+    ("GET", "/api/teacher/get_info", "student", {}),
+    ("GET", "/api/comments", None, {}),
+    ("GET", "/api/comments", None, {"query_string": {"limit": 3, "offset": 2}}),
+    ("GET", "/api/comments", None, {"query_string": {"before": "bad"}}),
+    ("GET", "/api/comments", None, {"query_string": {"limit": "x"}}),
+    ("GET", "/api/comments", None, {"query_string": {"limit": 0}}),
+    ("GET", "/api/comments", None, {"query_string": {"limit": -1, "offset": -3}}),
+    ("GET", "/api/comments", None, {"query_string": {"limit": 100000}}),
+    ("GET", "/api/comments/count", None, {}),
+]
+
+
+def report(name, passed, detail=None):
+    print(f"{'ok' if passed else 'FAIL':<5} {name}")
+    if not passed and detail:
+        print("      " + detail)
+    return not passed
+
+
+def request_count(endpoint):
+    """请求指标中该接口已记录的请求数"""
+    from metrics import request_duration
+
+    return sum(
+        value
+        for name, labels, value in request_duration.samples()
+        if name.endswith("_count") and f'endpoint="{endpoint}"' in labels
+    )
+
+
+def flask_call(client, method, path, kwargs, headers=None):
+    response = client.open(path, method=method, headers=headers, **kwargs)
+    return response.status_code, response.get_json(), response.headers.get("ETag")
+
+
+async def quart_call(client, method, path, kwargs, headers=None):
+    response = await client.open(path, method=method, headers=headers, **kwargs)
+    body = await response.get_json() if response.status_code != 304 else None
+    return response.status_code, body, response.headers.get("ETag")
+
+
+async def check(flask_app, quart_app):
+    flask_clients, quart_clients = {}, {}
+    for user_type in LOGINS:
+        flask_clients[user_type] = flask_app.test_client()
+        flask_clients[user_type].post("/api/login", **login_json(user_type))
+        quart_clients[user_type] = quart_app.test_client()
+        await quart_clients[user_type].post("/api/login", **login_json(user_type))
+
+    failed = 0
+    adapter = quart_app.url_map.bind("localhost")
+    checked = set()
+    for method, path, user_type, kwargs in CASES:
+        endpoint = adapter.match(path, method)[0]
+        checked.add((path, method))
+        name = f"{method} {path} {kwargs.get('query_string', '')}".rstrip()
+        flask_client = (
+            flask_clients[user_type] if user_type else flask_app.test_client()
+        )
+        quart_client = (
+            quart_clients[user_type] if user_type else quart_app.test_client()
+        )
+
+        expected = flask_call(flask_client, method, path, kwargs)
+        before = request_count(endpoint)
+        actual = await quart_call(quart_client, method, path, kwargs)
+        # 两边同样出错也不能通过检查
+        failed += report(
+            name,
+            actual == expected and expected[0] < 500,
+            f"Flask {expected!r}\n      Quart {actual!r}",
+        )
+        failed += report(f"{name} 记入请求指标", request_count(endpoint) == before + 1)
+
+        etag = expected[2]
+        if etag:
+            headers = {"If-None-Match": etag}
+            statuses = (
+                flask_call(flask_client, method, path, kwargs, headers)[0],
+                (await quart_call(quart_client, method, path, kwargs, headers))[0],
+            )
+            failed += report(f"{name} If-None-Match 返回304", statuses == (304, 304))
+
+    # 每个异步接口都必须登记
+    from asgi import ASYNC_ROUTES
+
+    for path, method in sorted(ASYNC_ROUTES - checked):
+        if method not in ("HEAD", "OPTIONS"):
+            failed += report(f"{method} {path} 未登记一致性检查", False)
+    return failed
+
+
+def main():
+    url = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "parity.db")
+    # app.py 和 asgi.py 在导入时按环境变量创建数据库连接
+    os.environ["DB_CONN_STRING"] = url
+    from app import app, db
+    from asgi import db as async_db, quart_app
+
+    seed(db)
+
+    async def run():
+        try:
+            return await check(app, quart_app)
+        finally:
+            await async_db.close()
+
+    failed = asyncio.run(run())
+    db.close()
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+多进程缓存一致性检查：两个 DatabaseManager 连接同一个SQLite文件，模拟两个工作进程，
+一个进程写入后，另一个进程按表版本号读取的缓存、登录和密码校验应立即看到新数据；
+任一项不符合时以非零状态退出
+
+用法：
+    python benchmarks/caches.py
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import DatabaseManager  # noqa: E402
+
+PASSWORD = "123456"
+
+
+def report(name, passed):
+    print(f"{'ok' if passed else 'FAIL':<5} {name}")
+    return not passed
+
+
+def versions(db, *tables):
+    # 与 app.conditional_get 相同：读数据前先读表版本号
+    result = tuple(db.get_table_versions(tables))
+    db.remove_session()
+    return result
+
+
+def main():
+    url = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "caches.db")
+    worker_a = DatabaseManager(url)
+    worker_b = DatabaseManager(url, mode="skip")
+    worker_a.add_teacher("T001", "教师", "信息学院", PASSWORD)
+    worker_a.add_course("C000", "课程0", 2, "T001", "2024-1")
+    worker_a.add_course("C001", "课程1", 3, "T001", "2024-1")
+    worker_a.add_student("S001", "学生1", "计算机", "1班", "男", "2004-01-01", PASSWORD)
+    worker_a.add_student("S002", "学生2", "计算机", "1班", "男", "2004-01-01", PASSWORD)
+    worker_a.add_grade("S001", "C000", "2024-1", 80)
+    worker_a.remove_session()
+    failed = 0
+
+    # 学生信息：版本号不变时命中缓存，其它进程修改后立即失效
+    version = versions(worker_a, "students")
+    worker_a.get_student("S001", version=version)
+    hits = worker_a.cache_stats()["entity"]["hits"]
+    worker_a.get_student("S001", version=version)
+    failed += report(
+        "版本号不变时命中实体缓存", worker_a.cache_stats()["entity"]["hits"] == hits + 1
+    )
+    worker_b.update_student("S001", sclass="2班")
+    student = worker_a.get_student("S001", version=versions(worker_a, "students"))
+    failed += report("其它进程修改学生后读到新数据", student.sclass == "2班")
+
+    # 学分绩点汇总：其它进程录入成绩后立即失效
+    version = versions(worker_a, "courses", "grades")
+    summary = worker_a.get_student_summary("S001", version=version)
+    failed += report(
+        "版本号不变时命中汇总缓存",
+        worker_a.get_student_summary("S001", version=version) is summary,
+    )
+    worker_b.add_grade("S001", "C001", "2024-1", 90)
+    summary = worker_a.get_student_summary(
+        "S001", version=versions(worker_a, "courses", "grades")
+    )
+    failed += report("其它进程录入成绩后汇总更新", summary["credits_attempted"] == 5)
+
+    # 登录和密码校验不使用缓存
+    worker_a.get_student("S002")
+    worker_b.update_student("S002", password="abc123")
+    failed += report(
+        "其它进程改密码后旧密码不能登录",
+        not worker_a.student_login("S002", PASSWORD)[0]
+        and worker_a.student_login("S002", "abc123")[0],
+    )
+    worker_b.delete_student("S002")
+    failed += report(
+        "其它进程删除账号后不能登录", not worker_a.student_login("S002", "abc123")[0]
+    )
+
+    worker_a.close()
+    worker_b.close()
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
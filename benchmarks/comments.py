@@ -0,0 +1,104 @@
+"""
+留言写入基准测试：多个线程同时留言时，逐条提交与批量写入（write-behind）的吞吐量，
+以及批量写入下每批的平均大小和写入耗时
+
+用法：
+    python benchmarks/comments.py [--url DB_URL] [--threads 1,8,32] [--comments 5000]
+
+未指定 --url 时使用 DB_CONN_STRING，均未设置则在临时目录创建 SQLite 数据库。
+批量写入的吞吐量计入关闭写入器前写完队列的时间。
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from comment_writer import (  # noqa: E402
+    CommentWriter,
+    flush_batch_size,
+    flush_duration,
+)
+from database import DatabaseManager  # noqa: E402
+
+
+def post(target, db, i):
+    try:
+        return target.add_comment(f"访客{i}", f"第{i}条留言")[0]
+    finally:
+        db.remove_session()
+
+
+def run(db, target, threads, comments):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        ok = sum(pool.map(lambda i: post(target, db, i), range(comments)))
+    if isinstance(target, CommentWriter):
+        target.close()
+    return ok, time.perf_counter() - start
+
+
+def histogram_totals(histogram):
+    # 未带标签的直方图只有一组数据：(总和, 次数)
+    data = histogram._values.get((), [0, 0])
+    return data[-2], data[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default=os.getenv("DB_CONN_STRING"))
+    parser.add_argument("--threads", default="1,8,32")
+    parser.add_argument("--comments", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--flush-ms", type=float, default=200)
+    args = parser.parse_args()
+
+    url = args.url
+    if not url:
+        url = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "comments.db")
+    thread_counts = [int(t) for t in args.threads.split(",")]
+    db = DatabaseManager(url, pool_size=max(thread_counts), max_overflow=0)
+
+    print(
+        f"{'方式':<8} {'threads':>8} {'留言数':>8} {'seconds':>9} {'条/s':>10} "
+        f"{'平均批量':>9} {'平均写入ms':>11}"
+    )
+    for threads in thread_counts:
+        for mode in ("逐条提交", "批量写入"):
+            before = db.get_comments_count()
+            sum_before, count_before = histogram_totals(flush_duration)
+            size_before = histogram_totals(flush_batch_size)[0]
+            if mode == "批量写入":
+                target = CommentWriter(
+                    db.engine,
+                    batch_size=args.batch_size,
+                    flush_ms=args.flush_ms,
+                    queue_size=args.comments,
+                )
+            else:
+                target = db
+            ok, elapsed = run(db, target, threads, args.comments)
+            written = db.get_comments_count() - before
+            db.remove_session()
+            assert ok == written == args.comments, f"提交{ok}条，写入{written}条"
+
+            seconds, flushes = histogram_totals(flush_duration)
+            flushes -= count_before
+            rows = histogram_totals(flush_batch_size)[0] - size_before
+            batch = f"{rows / flushes:.1f}" if flushes else "-"
+            flush_ms = (
+                f"{(seconds - sum_before) / flushes * 1000:.2f}" if flushes else "-"
+            )
+            print(
+                f"{mode:<8} {threads:>8} {args.comments:>8} {elapsed:>9.3f} "
+                f"{args.comments / elapsed:>10.1f} {batch:>9} {flush_ms:>11}"
+            )
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
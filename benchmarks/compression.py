@@ -0,0 +1,89 @@
+"""
+响应压缩基准测试：对大列表接口分别以不压缩、gzip、brotli 请求，输出响应字节数、
+服务端耗时，以及按给定带宽估算的传输时间和总延迟
+
+用法：
+    python benchmarks/compression.py [--students 20000] [--mbps 20] [--repeat 20]
+
+在临时SQLite库中用 seed.py 写入数据，通过 Flask 测试客户端请求真实路由。
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ENDPOINTS = [
+    "/api/admin/get_students?limit=1000",
+    "/api/admin/get_grades?limit=1000",
+    "/api/admin/get_courses?limit=1000",
+]
+
+
+def measure(client, path, encoding, repeat):
+    """返回(响应字节数, 服务端耗时中位数ms)"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.get(path, headers={"Accept-Encoding": encoding})
+        body = response.get_data()
+        samples.append(time.perf_counter() - start)
+    assert response.headers.get("Content-Encoding", "identity") == encoding, path
+    return len(body), statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--students", type=int, default=20000)
+    parser.add_argument("--courses", type=int, default=500)
+    parser.add_argument("--mbps", type=float, default=20, help="模拟的下行带宽")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.set_defaults(
+        teachers=50,
+        grades_per_student=5,
+        comments=0,
+        terms=4,
+        password="123456",
+        seed=42,
+        batch_size=10000,
+    )
+    args = parser.parse_args()
+
+    # app.py 在导入时按环境变量创建数据库连接
+    url = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "compression.db")
+    os.environ["DB_CONN_STRING"] = url
+    import seed as seeder
+    from app import app, db
+    from compression import available_encodings
+
+    seeder.seed(db, args)
+    client = app.test_client()
+    client.post(
+        "/api/login",
+        json={"user_type": "admin", "user_id": "admin", "password": "123456"},
+    )
+
+    print(f"带宽 {args.mbps:g} Mbps，服务端耗时取 {args.repeat} 次中位数")
+    print(
+        f"{'接口':<38} {'编码':<9} {'字节':>9} {'压缩比':>7} "
+        f"{'服务端ms':>9} {'传输ms':>8} {'合计ms':>8}"
+    )
+    for path in ENDPOINTS:
+        baseline = None
+        for encoding in ["identity", *reversed(available_encodings())]:
+            size, server_ms = measure(client, path, encoding, args.repeat)
+            transfer_ms = size * 8 / (args.mbps * 1e6) * 1000
+            baseline = baseline or size
+            print(
+                f"{path:<38} {encoding:<9} {size:>9} {baseline / size:>7.1f} "
+                f"{server_ms:>9.1f} {transfer_ms:>8.1f} {server_ms + transfer_ms:>8.1f}"
+            )
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+并发基准测试：不同线程数下按“每请求一个会话”方式访问数据库的吞吐量
+
+用法：
+    python benchmarks/concurrency.py [--url DB_URL] [--threads 1,2,4,8,16] [--requests 2000]
+
+未指定 --url 时使用 DB_CONN_STRING，均未设置则在临时目录创建 SQLite 数据库。
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import DatabaseManager, Student  # noqa: E402
+
+
+def seed(db, count):
+    db.session.add_all(
+        Student(
+            sno=f"S{i:06d}",
+            sname=f"学生{i}",
+            smajor="计算机",
+            password=db.hash_password("123456"),
+        )
+        for i in range(count)
+    )
+    db.session.commit()
+    db.remove_session()
+
+
+def handle_request(db, i, students):
+    """模拟一次请求：查询学生信息后释放会话；
+    绕过进程内缓存，测的是会话和连接池而不是缓存命中"""
+    try:
+        return db.get_student(f"S{i % students:06d}", cached=False) is not None
+    finally:
+        db.remove_session()
+
+
+def run(db, threads, requests, students):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        ok = sum(pool.map(lambda i: handle_request(db, i, students), range(requests)))
+    elapsed = time.perf_counter() - start
+    return ok, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default=os.getenv("DB_CONN_STRING"))
+    parser.add_argument("--threads", default="1,2,4,8,16")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--students", type=int, default=1000)
+    args = parser.parse_args()
+
+    url = args.url
+    if not url:
+        url = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+
+    thread_counts = [int(t) for t in args.threads.split(",")]
+    db = DatabaseManager(url, pool_size=max(thread_counts), max_overflow=0)
+    seed(db, args.students)
+
+    print(f"{'threads':>8} {'requests':>9} {'seconds':>9} {'req/s':>10}")
+    for threads in thread_counts:
+        ok, elapsed = run(db, threads, args.requests, args.students)
+        assert ok == args.requests, f"{args.requests - ok} 个请求未查到数据"
+        print(
+            f"{threads:>8} {args.requests:>9} {elapsed:>9.3f} {args.requests / elapsed:>10.1f}"
+        )
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+索引基准测试：对比有无二级索引时成绩/课程常用查询的延迟
+
+用法：
+    python benchmarks/indexes.py [--grades 1000000] [--repeat 200]
+
+分别建两个SQLite库：一个只有主键（旧表结构），一个使用 database.py 中声明的索引，
+写入相同数据后对每类查询重复执行并取中位数。
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from sqlalchemy import Column, MetaData, Table, create_engine, insert
+from sqlalchemy.orm import Session
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Base, Course, Grade, Student, Teacher  # noqa: E402
+
+TERMS = ["2022-1", "2022-2", "2023-1", "2023-2", "2024-1", "2024-2"]
+
+
+def bare_metadata():
+    """只保留列和主键、不含任何索引和约束的表结构"""
+    metadata = MetaData()
+    for model in (Student, Teacher, Course, Grade):
+        columns = [
+            Column(c.name, c.type, primary_key=c.primary_key)
+            for c in model.__table__.columns
+        ]
+        Table(model.__tablename__, metadata, *columns)
+    return metadata
+
+
+def load(engine, metadata, args):
+    metadata.create_all(engine)
+    rng = random.Random(args.seed)
+    students = [f"S{i:07d}" for i in range(args.students)]
+    courses = [f"C{i:05d}" for i in range(args.courses)]
+    with engine.begin() as conn:
+        conn.execute(
+            insert(Teacher.__table__),
+            [
+                {"tno": f"T{i:05d}", "tname": f"教师{i}", "password": "x"}
+                for i in range(args.teachers)
+            ],
+        )
+        conn.execute(
+            insert(Student.__table__),
+            [
+                {"sno": s, "sname": s, "smajor": "计算机", "password": "x"}
+                for s in students
+            ],
+        )
+        conn.execute(
+            insert(Course.__table__),
+            [
+                {
+                    "cno": c,
+                    "cname": f"课程{c}",
+                    "credit": rng.randint(1, 5),
+                    "tno": f"T{rng.randrange(args.teachers):05d}",
+                }
+                for c in courses
+            ],
+        )
+        # 按(学生, 课程, 学期)去重生成成绩
+        batch = []
+        seen = set()
+        while len(seen) < args.grades:
+            key = (rng.choice(students), rng.choice(courses), rng.choice(TERMS))
+            if key in seen:
+                continue
+            seen.add(key)
+            batch.append(
+                {
+                    "sno": key[0],
+                    "cno": key[1],
+                    "term": key[2],
+                    "grade": rng.randint(0, 100),
+                }
+            )
+            if len(batch) == 50000:
+                conn.execute(insert(Grade.__table__), batch)
+                batch = []
+        if batch:
+            conn.execute(insert(Grade.__table__), batch)
+    return students, courses
+
+
+def queries(rng, students, courses, teachers):
+    """与 app.py / database.py 中查询条件相同的几类查询"""
+    return {
+        "grades by (sno, term)": lambda s: s.query(Grade)
+        .filter_by(sno=rng.choice(students), term=rng.choice(TERMS))
+        .all(),
+        "grades by (cno, term)": lambda s: s.query(Grade)
+        .filter_by(cno=rng.choice(courses), term=rng.choice(TERMS))
+        .all(),
+        "courses by tno": lambda s: s.query(Course)
+        .filter_by(tno=f"T{rng.randrange(teachers):05d}")
+        .all(),
+        "course by cname": lambda s: s.query(Course)
+        .filter_by(cname=f"课程{rng.choice(courses)}")
+        .first(),
+    }
+
+
+def measure(engine, students, courses, args):
+    rng = random.Random(args.seed)
+    results = {}
+    with Session(engine) as session:
+        for name, run in queries(rng, students, courses, args.teachers).items():
+            timings = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                run(session)
+                timings.append(time.perf_counter() - start)
+            results[name] = statistics.median(timings) * 1000
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--grades", type=int, default=1_000_000)
+    parser.add_argument("--students", type=int, default=20000)
+    parser.add_argument("--courses", type=int, default=2000)
+    parser.add_argument("--teachers", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    results = {}
+    for label, metadata in (("before", bare_metadata()), ("after", Base.metadata)):
+        engine = create_engine("sqlite:///" + os.path.join(workdir, f"{label}.db"))
+        start = time.perf_counter()
+        students, courses = load(engine, metadata, args)
+        print(
+            f"{label}: 写入 {args.grades} 条成绩用时 {time.perf_counter() - start:.1f}s"
+        )
+        results[label] = measure(engine, students, courses, args)
+        engine.dispose()
+
+    print(f"\n{'query':<24} {'before ms':>10} {'after ms':>10} {'speedup':>9}")
+    for name, before in results["before"].items():
+        after = results["after"][name]
+        print(f"{name:<24} {before:>10.3f} {after:>10.3f} {before / after:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
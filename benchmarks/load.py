@@ -0,0 +1,193 @@
+"""
+接口压测：写入可配置规模的模拟数据后，用多个并发客户端请求真实的 Flask 路由，
+输出各接口的 p50/p95/p99 延迟、吞吐量和平均每请求SQL语句数（JSON）。
+
+用法：
+    python benchmarks/load.py [--url DB_URL] [--clients 8] [--requests 500] [--output result.json]
+
+未指定 --url 时使用临时 SQLite 库。指定 PostgreSQL 等已有库时请使用空库。
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import event
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def seed(db, args):
+    """用 seed.py 批量写入模拟数据，返回压测时用到的学号和(课程名, 教师工号)"""
+    from database import Course, Student
+    import seed as seeder
+
+    seeder.seed(db, args)
+    students = [sno for (sno,) in db.session.query(Student.sno)]
+    courses = db.session.query(Course.cname, Course.tno).all()
+    db.remove_session()
+    return students, courses
+
+
+class QueriesPerThread:
+    """按线程统计SQL语句数，并发请求之间互不干扰"""
+
+    def __init__(self, engine):
+        self.local = threading.local()
+        event.listen(engine, "after_cursor_execute", self._record)
+
+    def _record(self, *args):
+        self.local.count = getattr(self.local, "count", 0) + 1
+
+    def reset(self):
+        self.local.count = 0
+
+    @property
+    def count(self):
+        return getattr(self.local, "count", 0)
+
+
+def scenarios(rng, students, courses):
+    """(名称, 登录函数, 请求函数)；登录函数为None时不登录"""
+    by_teacher = {}
+    for cname, tno in courses:
+        by_teacher.setdefault(tno, []).append(cname)
+
+    def login(client, user_type, user_id, password):
+        client.post(
+            "/api/login",
+            json={"user_type": user_type, "user_id": user_id, "password": password},
+        )
+
+    def student(client):
+        login(client, "student", rng.choice(students), "123456")
+
+    def teacher(client):
+        tno = rng.choice(list(by_teacher))
+        login(client, "teacher", tno, "123456")
+        client.courses = by_teacher[tno]
+
+    def admin(client):
+        login(client, "admin", "admin", "123456")
+
+    return [
+        (
+            "POST /api/login",
+            None,
+            lambda c: c.post(
+                "/api/login",
+                json={
+                    "user_type": "student",
+                    "user_id": rng.choice(students),
+                    "password": "123456",
+                },
+            ),
+        ),
+        ("GET /api/student/grades", student, lambda c: c.get("/api/student/grades")),
+        (
+            "GET /api/teacher/grades",
+            teacher,
+            lambda c: c.get(
+                "/api/teacher/grades",
+                query_string={"course_name": rng.choice(c.courses)},
+            ),
+        ),
+        (
+            "GET /api/teacher/get_grades",
+            teacher,
+            lambda c: c.get("/api/teacher/get_grades"),
+        ),
+        ("GET /api/admin/get_grades", admin, lambda c: c.get("/api/admin/get_grades")),
+        ("GET /api/comments", None, lambda c: c.get("/api/comments?limit=5")),
+    ]
+
+
+def run_scenario(app, counter, prepare, call, args):
+    local = threading.local()
+
+    def one_request(_):
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = app.test_client()
+            if prepare:
+                prepare(client)
+        counter.reset()
+        start = time.perf_counter()
+        response = call(client)
+        elapsed = time.perf_counter() - start
+        ok = response.status_code == 200 and response.get_json().get("success", True)
+        return elapsed, counter.count, ok
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.clients) as pool:
+        samples = list(pool.map(one_request, range(args.requests)))
+    wall = time.perf_counter() - start
+
+    latencies = [s[0] * 1000 for s in samples]
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "requests": len(samples),
+        "errors": sum(not s[2] for s in samples),
+        "p50_ms": round(cuts[49], 3),
+        "p95_ms": round(cuts[94], 3),
+        "p99_ms": round(cuts[98], 3),
+        "throughput_rps": round(len(samples) / wall, 1),
+        "queries_per_request": round(statistics.fmean(s[1] for s in samples), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", help="默认在临时目录创建 SQLite 库")
+    parser.add_argument("--students", type=int, default=5000)
+    parser.add_argument("--teachers", type=int, default=100)
+    parser.add_argument("--courses", type=int, default=300)
+    parser.add_argument("--grades-per-student", type=int, default=20)
+    parser.add_argument("--comments", type=int, default=1000)
+    parser.add_argument("--terms", type=int, default=4)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=500, help="每个接口的请求数")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="结果写入文件，默认输出到标准输出")
+    parser.set_defaults(password="123456", batch_size=10000)
+    args = parser.parse_args()
+
+    url = args.url or "sqlite:///" + os.path.join(tempfile.mkdtemp(), "load.db")
+    # app.py 在导入时按环境变量创建数据库连接
+    os.environ["DB_CONN_STRING"] = url
+    os.environ.setdefault("DB_POOL_SIZE", str(args.clients))
+    from app import app, db
+
+    start = time.perf_counter()
+    students, courses = seed(db, args)
+    seed_seconds = time.perf_counter() - start
+
+    counter = QueriesPerThread(db.engine)
+    rng = random.Random(args.seed)
+    results = {}
+    for name, prepare, call in scenarios(rng, students, courses):
+        results[name] = run_scenario(app, counter, prepare, call, args)
+        print(f"{name}: {results[name]}", file=sys.stderr)
+
+    report = {
+        "config": {**vars(args), "url": url.split("@")[-1]},
+        "seed_seconds": round(seed_seconds, 2),
+        "results": results,
+    }
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
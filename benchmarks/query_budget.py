@@ -0,0 +1,386 @@
+"""
+查询次数检查：统计关键数据访问方法和每个接口执行的SQL语句数，超出预算时以非零状态退出
+
+用法：
+    python benchmarks/query_budget.py
+
+在临时SQLite库中写入少量数据后逐项检查，可直接接入CI。每次请求前清空缓存，
+按缓存未命中的最坏情况计数；新增接口时需在 ROUTES 中登记预算，否则检查失败。
+接口返回5xx时同样视为失败。
+"""
+
+import io
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PASSWORD = "123456"
+
+
+def seed(db):
+    db.add_teacher("T001", "教师", "信息学院", PASSWORD)
+    db.add_teacher("T099", "待删除教师", "信息学院")
+    for i in range(5):
+        db.add_course(f"C{i:03d}", f"课程{i}", i + 1, "T001", "2024-1")
+    db.add_course("C099", "待删除课程", 1, "T001", "2024-1")
+    for i in range(10):
+        db.add_student(
+            f"S{i:03d}", f"学生{i}", "计算机", "1班", "男", "2004-01-01", PASSWORD
+        )
+        for j in range(5):
+            db.add_grade(f"S{i:03d}", f"C{j:03d}", "2024-1", 50 + i * 5)
+    db.add_student("S099", "待删除学生", "计算机", "1班", "女", "2004-01-01")
+    db.add_admin("A099", "待删除管理员", PASSWORD)
+    for i in range(10):
+        db.add_comment(f"访客{i}", f"留言{i}")
+    db.remove_session()
+
+
+# (检查项, 调用, 允许的最多SQL语句数)
+CHECKS = [
+    ("get_grades_by_student", lambda db: db.get_grades_by_student("S001"), 1),
+    (
+        "get_grades_by_student(term)",
+        lambda db: db.get_grades_by_student("S001", term="2024-1"),
+        1,
+    ),
+]
+
+
+def csv_upload(text):
+    return {"data": {"file": (io.BytesIO(text.encode()), "upload.csv")}}
+
+
+# (方法, 路径, 登录身份, 请求参数, 允许的最多SQL语句数)；按顺序执行，写操作放在读之后。
+# 登录身份为None时使用未登录的新客户端
+ROUTES = [
+    # 页面
+    ("GET", "/", None, {}, 0),
+    ("GET", "/login", None, {}, 0),
+    ("GET", "/dashboard", "student", {}, 0),
+    ("GET", "/logout", None, {}, 0),
+    ("GET", "/metrics", None, {}, 0),
+    # 公共接口
+    (
+        "POST",
+        "/api/login",
+        None,
+        {"json": {"user_type": "student", "user_id": "S001", "password": PASSWORD}},
+        1,
+    ),
+    ("GET", "/api/comments", None, {"query_string": {"limit": 5}}, 1),
+    ("GET", "/api/comments/count", None, {}, 1),
+    ("POST", "/api/comments", None, {"json": {"name": "访客", "content": "留言"}}, 2),
+    # 学生
+    ("GET", "/api/student/get_info", "student", {}, 2),
+    ("GET", "/api/student/courses", "student", {}, 2),
+    ("GET", "/api/student/grades", "student", {}, 2),
+    ("GET", "/api/student/transcript", "student", {}, 2),
+    ("GET", "/api/student/summary", "student", {}, 2),
+    ("POST", "/api/student/update_info", "student", {"json": {"sclass": "2班"}}, 4),
+    (
+        "POST",
+        "/api/student/change_password",
+        "student",
+        {"json": {"old_password": PASSWORD, "new_password": PASSWORD}},
+        3,
+    ),
+    (
+        "POST",
+        "/api/change_password",
+        "student",
+        {"json": {"old_password": PASSWORD, "new_password": "abc123"}},
+        4,
+    ),
+    # 教师
+    ("GET", "/api/teacher/get_info", "teacher", {}, 2),
+    (
+        "GET",
+        "/api/teacher/grades",
+        "teacher",
+        {"query_string": {"course_name": "课程0"}},
+        4,
+    ),
+    (
+        "GET",
+        "/api/teacher/students",
+        "teacher",
+        {"query_string": {"course_name": "课程0"}},
+        2,
+    ),
+    (
+        "GET",
+        "/api/teacher/get_grades",
+        "teacher",
+        {"query_string": {"term": "2024-1"}},
+        2,
+    ),
+    ("GET", "/api/teacher/course_stats", "teacher", {}, 2),
+    ("GET", "/api/teacher/get_courses", "teacher", {}, 2),
+    ("POST", "/api/teacher/update_info", "teacher", {"json": {"tdept": "信息学院"}}, 3),
+    (
+        "POST",
+        "/api/teacher/add_grade",
+        "teacher",
+        {
+            "json": {
+                "student_sno": "S000",
+                "course_no": "C000",
+                "term": "2024-2",
+                "grade": 80,
+            }
+        },
+        7,
+    ),
+    (
+        "POST",
+        "/api/teacher/add_grades",
+        "teacher",
+        {
+            "json": {
+                "course_no": "C001",
+                "term": "2024-2",
+                "grades": [
+                    {"student_sno": f"S{i:03d}", "grade": 60 + i} for i in range(10)
+                ],
+            }
+        },
+        6,
+    ),
+    (
+        "POST",
+        "/api/teacher/update_grade",
+        "teacher",
+        {"json": {"grade_id": 1, "grade": 90}},
+        4,
+    ),
+    (
+        "POST",
+        "/api/teacher/enter_grade",
+        "teacher",
+        {"json": {"sno": "S001", "course_name": "课程0", "grade": 90}},
+        6,
+    ),
+    (
+        "POST",
+        "/api/teacher/add_course",
+        "teacher",
+        {"json": {"cno": "C010", "cname": "课程10", "credit": 2, "term": "2024-2"}},
+        6,
+    ),
+    (
+        "POST",
+        "/api/teacher/change_password",
+        "teacher",
+        {"json": {"old_password": PASSWORD, "new_password": PASSWORD}},
+        3,
+    ),
+    # 管理员：查询
+    ("GET", "/api/admin/get_students", "admin", {}, 2),
+    ("GET", "/api/admin/get_teachers", "admin", {}, 2),
+    ("GET", "/api/admin/get_courses", "admin", {}, 2),
+    ("GET", "/api/admin/get_grades", "admin", {"query_string": {"cno": "C000"}}, 2),
+    ("GET", "/api/admin/get_admins", "admin", {}, 2),
+    ("GET", "/api/admin/cache_stats", "admin", {}, 0),
+    ("GET", "/api/admin/export/grades", "admin", {}, 1),
+    # 管理员：写入
+    (
+        "POST",
+        "/api/admin/add_student",
+        "admin",
+        {
+            "json": {
+                "sno": "S010",
+                "sname": "新学生",
+                "smajor": "数学",
+                "sclass": "1班",
+                "sex": "女",
+                "birthday": "2004-01-01",
+            }
+        },
+        3,
+    ),
+    (
+        "POST",
+        "/api/admin/import_students",
+        "admin",
+        csv_upload(
+            "sno,sname,smajor,sclass,sex,birthday\n"
+            + "".join(f"S1{i:02d},导入{i},数学,1班,男,2004-01-01\n" for i in range(20))
+        ),
+        3,
+    ),
+    (
+        "POST",
+        "/api/admin/update_student",
+        "admin",
+        {"json": {"sno": "S001", "sclass": "2班"}},
+        2,
+    ),
+    ("POST", "/api/admin/delete_student", "admin", {"json": {"sno": "S099"}}, 4),
+    (
+        "POST",
+        "/api/admin/add_teacher",
+        "admin",
+        {"json": {"tno": "T010", "tname": "新教师", "tdept": "数学科学学院"}},
+        3,
+    ),
+    (
+        "POST",
+        "/api/admin/import_teachers",
+        "admin",
+        csv_upload(
+            "tno,tname,tdept\n"
+            + "".join(f"T1{i:02d},导入{i},信息学院\n" for i in range(20))
+        ),
+        3,
+    ),
+    (
+        "POST",
+        "/api/admin/update_teacher",
+        "admin",
+        {"json": {"tno": "T001", "tname": "教师"}},
+        2,
+    ),
+    ("POST", "/api/admin/delete_teacher", "admin", {"json": {"tno": "T099"}}, 4),
+    (
+        "POST",
+        "/api/admin/add_course",
+        "admin",
+        {
+            "json": {
+                "cno": "C011",
+                "cname": "课程11",
+                "credit": 3,
+                "tno": "T001",
+                "term": "2024-2",
+            }
+        },
+        6,
+    ),
+    (
+        "POST",
+        "/api/admin/update_course",
+        "admin",
+        {"json": {"cno": "C000", "credit": 2}},
+        3,
+    ),
+    ("POST", "/api/admin/delete_course", "admin", {"json": {"cno": "C099"}}, 5),
+    (
+        "POST",
+        "/api/admin/add_admin",
+        "admin",
+        {"json": {"ano": "A010", "aname": "新管理员"}},
+        3,
+    ),
+    (
+        "POST",
+        "/api/admin/update_admin",
+        "admin",
+        {"json": {"ano": "A010", "aname": "管理员"}},
+        3,
+    ),
+    ("POST", "/api/admin/delete_admin", "admin", {"json": {"ano": "A099"}}, 3),
+    (
+        "POST",
+        "/api/admin/change_password",
+        "admin",
+        {"json": {"old_password": PASSWORD, "new_password": PASSWORD}},
+        3,
+    ),
+]
+
+LOGINS = {
+    "admin": ("admin", PASSWORD),
+    "teacher": ("T001", PASSWORD),
+    "student": ("S001", PASSWORD),
+}
+
+
+def report(name, counter, budget):
+    status = "ok" if counter.count <= budget else "FAIL"
+    print(f"{status:<5} {name:<40} {counter.count:>3} / {budget}")
+    if status == "FAIL":
+        for statement in counter.statements:
+            print("      " + " ".join(statement.split()))
+    return status == "FAIL"
+
+
+def check_methods(db):
+    failed = 0
+    for name, call, budget in CHECKS:
+        with db.count_queries() as counter:
+            call(db)
+        db.remove_session()
+        failed += report(name, counter, budget)
+    return failed
+
+
+def check_routes(app, db):
+    clients = {}
+    for user_type, (user_id, password) in LOGINS.items():
+        client = clients[user_type] = app.test_client()
+        response = client.post(
+            "/api/login",
+            json={"user_type": user_type, "user_id": user_id, "password": password},
+        )
+        assert response.get_json()["success"], f"{user_type} 登录失败"
+
+    failed = 0
+    adapter = app.url_map.bind("localhost")
+    checked = set()
+    for method, path, user_type, kwargs, budget in ROUTES:
+        checked.add((adapter.match(path, method)[0], method))
+        client = clients[user_type] if user_type else app.test_client()
+        db.clear_caches()
+        with db.count_queries() as counter:
+            response = client.open(path, method=method, **kwargs)
+            # 流式响应在读取响应体时才执行查询
+            response.get_data()
+        failed += report(f"{method} {path} [{response.status_code}]", counter, budget)
+        # 出错的接口可能一条SQL都没执行，不能因此通过检查
+        if response.status_code >= 500:
+            failed += 1
+            print(f"{'FAIL':<5} {method} {path} 返回 {response.status_code}")
+
+        # 带ETag的接口：重复请求应返回304，只读取版本号
+        if response.headers.get("ETag"):
+            with db.count_queries() as counter:
+                response = client.open(
+                    path,
+                    method=method,
+                    headers={"If-None-Match": response.headers["ETag"]},
+                    **kwargs,
+                )
+            if response.status_code != 304:
+                failed += 1
+                print(f"{'FAIL':<5} {method} {path} If-None-Match 未返回304")
+            failed += report(f"{method} {path} [304]", counter, 1)
+
+    # 每个接口都必须登记预算
+    for rule in app.url_map.iter_rules():
+        if rule.endpoint == "static":
+            continue
+        for method in rule.methods - {"HEAD", "OPTIONS"}:
+            if (rule.endpoint, method) not in checked:
+                failed += 1
+                print(f"{'FAIL':<5} {method} {rule.rule} 未设置查询预算")
+    return failed
+
+
+def main():
+    url = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "budget.db")
+    # app.py 在导入时按环境变量创建数据库连接
+    os.environ["DB_CONN_STRING"] = url
+    from app import app, db
+
+    seed(db)
+    failed = check_methods(db) + check_routes(app, db)
+    db.close()
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+读写分离检查：用两个本地SQLite文件分别作为主库和只读副本，检查读取路由是否正确，
+任一项不符合时以非零状态退出
+
+用法：
+    python benchmarks/replicas.py
+
+副本文件由主库复制得到，之后只在副本中写入一名标记学生，借此区分读取来自哪个库：
+    - 普通读取走副本
+    - 同一请求中提交写入之后的读取走主库；写入过的会话在 DB_REPLICA_STICKY_SECONDS 内
+      的后续请求也走主库，其他会话仍读副本
+    - 不健康的副本被跳过，全部不可用时回到主库
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PASSWORD = "123456"
+# 只存在于副本中的学生
+REPLICA_ONLY = "R001"
+
+
+def prepare(primary_path, replica_path):
+    """建主库并复制为副本"""
+    from database import DatabaseManager
+
+    primary = DatabaseManager("sqlite:///" + primary_path, replica_urls=[])
+    primary.add_student("S001", "学生1", "计算机", "1班", "男", "2004-01-01", PASSWORD)
+    primary.close()
+    shutil.copyfile(primary_path, replica_path)
+
+    replica = DatabaseManager("sqlite:///" + replica_path, mode="skip", replica_urls=[])
+    replica.add_student(
+        REPLICA_ONLY, "副本学生", "计算机", "1班", "女", "2004-01-01", PASSWORD
+    )
+    replica.close()
+
+
+def reads_replica(db):
+    """当前请求的读取是否来自副本"""
+    from database import Student
+
+    return db.read_session.get(Student, REPLICA_ONLY) is not None
+
+
+def report(name, passed):
+    print(f"{'ok' if passed else 'FAIL':<5} {name}")
+    return not passed
+
+
+def check_manager(primary_url, replica_url, directory):
+    from database import DatabaseManager
+
+    failed = 0
+    db = DatabaseManager(primary_url, mode="skip", replica_urls=[replica_url])
+    failed += report("普通读取走副本", reads_replica(db))
+    db.remove_session()
+
+    db.add_student("S002", "学生2", "计算机", "1班", "男", "2004-01-01", PASSWORD)
+    failed += report("同一请求写入后读取走主库", not reads_replica(db))
+    db.remove_session()
+    failed += report("下一个请求重新读副本", reads_replica(db))
+    db.remove_session()
+
+    db.use_primary()
+    failed += report("use_primary 后读取走主库", not reads_replica(db))
+    db.remove_session()
+    db.close()
+
+    # 目录不存在，SQLite无法打开，健康检查失败
+    broken_url = "sqlite:///" + os.path.join(directory, "missing", "replica.db")
+    db = DatabaseManager(
+        primary_url, mode="skip", replica_urls=[broken_url, replica_url]
+    )
+    results = []
+    for _ in range(4):
+        results.append(reads_replica(db))
+        db.remove_session()
+    failed += report("跳过不健康的副本，轮询到健康的副本", all(results))
+    failed += report("不健康的副本被标记", not db.replicas[0].healthy)
+    db.close()
+
+    db = DatabaseManager(primary_url, mode="skip", replica_urls=[broken_url])
+    failed += report("副本全部不可用时读主库", not reads_replica(db))
+    db.close()
+    return failed
+
+
+def check_app():
+    # 通过 Flask 应用检查写入后的会话粘滞：写入过的会话后续请求读主库，其他会话仍读副本
+    from app import app, db
+
+    def login():
+        client = app.test_client()
+        response = client.post(
+            "/api/login",
+            json={"user_type": "admin", "user_id": "admin", "password": PASSWORD},
+        )
+        assert response.get_json()["success"], "admin 登录失败"
+        return client
+
+    def students(client):
+        response = client.get("/api/admin/get_students")
+        return {row["sno"] for row in response.get_json()["students"]}
+
+    failed = 0
+    writer = login()
+    response = writer.post(
+        "/api/admin/add_student",
+        json={"sno": "S003", "sname": "学生3", "smajor": "计算机"},
+    )
+    failed += report("接口写入成功", response.get_json()["success"])
+    with writer.session_transaction() as session:
+        failed += report("写入后的会话标记读主库", "primary_until" in session)
+    seen = students(writer)
+    failed += report(
+        "写入粘滞期内读取走主库", "S003" in seen and REPLICA_ONLY not in seen
+    )
+
+    seen = students(login())
+    failed += report("其他会话读取走副本", REPLICA_ONLY in seen and "S003" not in seen)
+    db.close()
+    return failed
+
+
+def main():
+    directory = tempfile.mkdtemp()
+    primary_path = os.path.join(directory, "primary.db")
+    replica_path = os.path.join(directory, "replica.db")
+    primary_url, replica_url = "sqlite:///" + primary_path, "sqlite:///" + replica_path
+    # database.py 在导入时读取连接配置，app.py 在导入时创建数据库连接
+    os.environ["DB_CONN_STRING"] = primary_url
+    os.environ["DB_REPLICA_URLS"] = replica_url
+
+    prepare(primary_path, replica_path)
+    failed = check_manager(primary_url, replica_url, directory)
+    os.environ["DB_INIT_MODE"] = "skip"
+    failed += check_app()
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
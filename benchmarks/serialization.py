@@ -0,0 +1,102 @@
+"""
+列表接口序列化基准测试：对比 ORM 整行加载与列投影、标准库 json 与 orjson
+组合下，查询并序列化学生列表的耗时、内存峰值和响应体大小
+
+用法：
+    python benchmarks/serialization.py [--rows 50000] [--repeat 5]
+
+在临时SQLite库中写入学生数据；耗时取多次重复中的最小值，
+内存峰值用 tracemalloc 单独测一次（开启跟踪会拖慢执行）。
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import seed as seeder  # noqa: E402
+from database import LIST_COLUMNS, DatabaseManager, Student  # noqa: E402
+from json_provider import OrjsonProvider, orjson  # noqa: E402
+
+FIELDS = [c.key for c in LIST_COLUMNS["students"]]
+
+
+def load_orm(db):
+    return db.session.query(Student).order_by(Student.sno).all()
+
+
+def load_projected(db):
+    return db.session.query(*LIST_COLUMNS["students"]).order_by(Student.sno).all()
+
+
+def run(db, load, provider):
+    """返回(查询秒数, 序列化秒数, 响应体字节数)"""
+    start = time.perf_counter()
+    rows = load(db)
+    loaded = time.perf_counter()
+    data = [{f: getattr(r, f) for f in FIELDS} for r in rows]
+    body = provider.response({"success": True, "students": data}).get_data()
+    done = time.perf_counter()
+    db.remove_session()
+    return loaded - start, done - loaded, len(body)
+
+
+def peak_memory(db, load, provider):
+    tracemalloc.start()
+    try:
+        run(db, load, provider)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    url = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "serialization.db")
+    db = DatabaseManager(url)
+    rows = seeder.generate_students(random.Random(42), args.rows, "0" * 64)
+    seeder.load(db.engine, Student, rows, 10000)
+
+    app = Flask(__name__)
+    providers = [("json", DefaultJSONProvider(app))]
+    if orjson is not None:
+        fast = OrjsonProvider(app)
+        fast.sort_keys = False
+        providers.append(("orjson", fast))
+    else:
+        print("未安装 orjson，只测试标准库 json", file=sys.stderr)
+
+    print(f"{args.rows} 行学生数据，耗时取 {args.repeat} 次中的最小值")
+    print(
+        f"{'方式':<16} {'查询(ms)':>10} {'序列化(ms)':>12} {'合计(ms)':>10} "
+        f"{'内存峰值(MB)':>14} {'响应(KB)':>10}"
+    )
+    for load_name, load in (("ORM", load_orm), ("投影", load_projected)):
+        for provider_name, provider in providers:
+            samples = [run(db, load, provider) for _ in range(args.repeat)]
+            query = min(s[0] for s in samples) * 1000
+            serialize = min(s[1] for s in samples) * 1000
+            total = min(s[0] + s[1] for s in samples) * 1000
+            peak = peak_memory(db, load, provider) / 1024 / 1024
+            name = f"{load_name} + {provider_name}"
+            print(
+                f"{name:<16} {query:>10.1f} {serialize:>12.1f} {total:>10.1f} "
+                f"{peak:>14.1f} {samples[0][2] / 1024:>10.0f}"
+            )
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
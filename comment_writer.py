@@ -0,0 +1,152 @@
+"""
+留言板批量写入（write-behind）：留言先进入有界队列，由后台线程每隔一段时间或
+攒够一批后在一个事务中批量插入并累加留言计数，代替每条留言单独提交一次。
+队列满时等待一小段时间，仍无空位则拒绝本次留言（由接口返回503）；
+进程退出时写完队列中剩余的留言。留言在下一次批量写入后才对读取可见。
+
+环境变量：
+    COMMENT_WRITE_BEHIND        设为 1/true 时启用，默认关闭（逐条提交）
+    COMMENT_BATCH_SIZE          每批最多写入的留言数，默认 100
+    COMMENT_FLUSH_MS            一批最长等待的毫秒数，默认 200
+    COMMENT_QUEUE_SIZE          队列容量，默认 10000
+    COMMENT_ENQUEUE_TIMEOUT_MS  队列满时提交方最多等待的毫秒数，默认 100
+"""
+
+from sqlalchemy import insert, update
+from sqlalchemy.exc import SQLAlchemyError
+from datetime import datetime
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+
+from database import Comment, Counter
+from metrics import registry
+
+COMMENT_WRITE_BEHIND = os.getenv("COMMENT_WRITE_BEHIND", "").lower() in (
+    "1",
+    "true",
+    "yes",
+    "on",
+)
+COMMENT_BATCH_SIZE = int(os.getenv("COMMENT_BATCH_SIZE", "100"))
+COMMENT_FLUSH_MS = float(os.getenv("COMMENT_FLUSH_MS", "200"))
+COMMENT_QUEUE_SIZE = int(os.getenv("COMMENT_QUEUE_SIZE", "10000"))
+COMMENT_ENQUEUE_TIMEOUT_MS = float(os.getenv("COMMENT_ENQUEUE_TIMEOUT_MS", "100"))
+
+logger = logging.getLogger(__name__)
+
+flush_duration = registry.histogram("comment_flush_seconds", "留言批量写入耗时")
+flush_batch_size = registry.histogram(
+    "comment_flush_batch_size",
+    "每批写入的留言数",
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500, 1000),
+)
+comments_rejected_total = registry.counter(
+    "comments_rejected_total", "队列已满被拒绝的留言数"
+)
+comments_dropped_total = registry.counter(
+    "comments_dropped_total", "批量写入失败而丢弃的留言数"
+)
+
+# 通知后台线程写完剩余留言后退出
+_STOP = object()
+
+
+class CommentWriter:
+    """与 DatabaseManager.add_comment 接口一致的批量留言写入器"""
+
+    def __init__(
+        self,
+        engine,
+        batch_size=COMMENT_BATCH_SIZE,
+        flush_ms=COMMENT_FLUSH_MS,
+        queue_size=COMMENT_QUEUE_SIZE,
+        enqueue_timeout_ms=COMMENT_ENQUEUE_TIMEOUT_MS,
+    ):
+        self.engine = engine
+        self.batch_size = batch_size
+        self.flush_interval = flush_ms / 1000
+        self.enqueue_timeout = enqueue_timeout_ms / 1000
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._run, name="comment-writer", daemon=True
+        )
+        self._thread.start()
+
+    def depth(self):
+        return self._queue.qsize()
+
+    def add_comment(self, name, content):
+        # 留言时间取提交时刻，而不是写入数据库的时刻
+        row = {"name": name, "content": content, "timestamp": datetime.now()}
+        if self._closed:
+            return False, "留言失败: 服务正在关闭"
+        try:
+            self._queue.put(row, timeout=self.enqueue_timeout)
+        except queue.Full:
+            comments_rejected_total.inc()
+            return False, "留言过多，请稍后再试"
+        return True, "留言成功"
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            # 从第一条留言入队起最多等待 flush_interval，或攒满一批
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._flush(batch)
+
+    def _flush(self, batch):
+        # 一批留言和计数累加在同一事务中提交
+        start = time.perf_counter()
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(insert(Comment), batch)
+                conn.execute(
+                    update(Counter)
+                    .where(Counter.name == "comments")
+                    .values(value=Counter.value + len(batch))
+                )
+        except SQLAlchemyError:
+            comments_dropped_total.inc(amount=len(batch))
+            logger.exception("批量写入 %d 条留言失败，已丢弃", len(batch))
+        finally:
+            flush_duration.observe(time.perf_counter() - start)
+            flush_batch_size.observe(len(batch))
+
+    def close(self, timeout=None):
+        """停止接收留言，写完队列中剩余的留言后返回"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+
+def init_comment_writer(db, enabled=None):
+    """启用批量写入时返回 CommentWriter 并在进程退出时写完剩余留言，否则返回None"""
+    if not (COMMENT_WRITE_BEHIND if enabled is None else enabled):
+        return None
+    writer = CommentWriter(db.engine)
+    registry.gauge("comment_queue_depth", "等待写入的留言数", writer.depth)
+    atexit.register(writer.close)
+    return writer
@@ -0,0 +1,78 @@
+"""
+响应压缩：按 Accept-Encoding 协商，对超过大小阈值的文本/JSON响应做 brotli 或 gzip 压缩。
+未安装 brotli 时只使用 gzip；流式响应（如导出接口）和已编码的响应不处理。
+
+环境变量：
+    COMPRESS_MIN_SIZE  小于该字节数的响应不压缩，默认 1024
+    COMPRESS_LEVEL     gzip 压缩级别 1-9，默认 6
+    BROTLI_QUALITY     brotli 压缩质量 0-11，默认 4
+"""
+
+from flask import request
+import gzip
+import os
+
+try:
+    import brotli
+except ImportError:  # brotli 为可选依赖
+    brotli = None
+
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+COMPRESS_LEVEL = int(os.getenv("COMPRESS_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+
+COMPRESSIBLE_TYPES = {
+    "application/json",
+    "application/javascript",
+    "application/x-ndjson",
+    "image/svg+xml",
+}
+
+
+def _compressible(mimetype):
+    return mimetype in COMPRESSIBLE_TYPES or (mimetype or "").startswith("text/")
+
+
+def compress(data, encoding, level=None):
+    """按编码压缩字节串；level 未指定时使用环境变量中的配置"""
+    if encoding == "br":
+        quality = BROTLI_QUALITY if level is None else level
+        return brotli.compress(data, quality=quality)
+    return gzip.compress(data, compresslevel=COMPRESS_LEVEL if level is None else level)
+
+
+def available_encodings():
+    """服务端支持的编码，按优先顺序"""
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def compress_response(response):
+    """after_request 钩子：满足条件时原地压缩响应体"""
+    if (
+        response.status_code != 200
+        or response.direct_passthrough
+        or response.is_streamed
+        or "Content-Encoding" in response.headers
+        or not _compressible(response.mimetype)
+    ):
+        return response
+    # 内容随 Accept-Encoding 变化，缓存需区分
+    response.vary.add("Accept-Encoding")
+    encoding = request.accept_encodings.best_match(available_encodings())
+    if encoding is None:
+        return response
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_SIZE:
+        return response
+
+    response.set_data(compress(data, encoding))
+    response.headers["Content-Encoding"] = encoding
+    # 压缩后字节不同，强ETag须改为弱ETag
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_compression(app):
+    app.after_request(compress_response)
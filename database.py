@@ -1,13 +1,107 @@
-from sqlalchemy import create_engine, Column, String, Integer, ForeignKey, DateTime
-from sqlalchemy.orm import sessionmaker, declarative_base, relationship
+from sqlalchemy import (
+    create_engine,
+    inspect,
+    and_,
+    case,
+    delete,
+    event,
+    func,
+    insert,
+    or_,
+    select,
+    text,
+    union_all,
+    update,
+    Column,
+    String,
+    Integer,
+    ForeignKey,
+    DateTime,
+    Index,
+    UniqueConstraint,
+)
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import (
+    aliased,
+    declarative_base,
+    relationship,
+    scoped_session,
+    sessionmaker,
+)
 from dotenv import load_dotenv
+from collections import OrderedDict
+from contextlib import ContextDecorator
 from datetime import datetime
+import bisect
 import hashlib
+import itertools
+import logging
+import math
 import os
+import threading
+import time
 
 Base = declarative_base()
 load_dotenv()
 conn_str = os.getenv("DB_CONN_STRING")
+# 启动时的建表方式：
+#   ensure - 只创建缺失的表和索引（默认），不删除任何数据
+#   reset  - 删除后重建所有表，仅用于开发环境
+#   skip   - 不检查表结构，适合已用 migrations.py 升级过的库上扩容大量进程
+init_mode = os.getenv("DB_INIT_MODE", "ensure")
+
+# 当前代码对应的表结构版本，新增迁移时同步修改（见 migrations.py）
+SCHEMA_VERSION = 7
+
+# 维护版本号的表：每次写入在同一事务中递增计数表里的 version:<表名>，
+# 接口据此生成ETag，版本号不变时直接返回304
+VERSIONED_TABLES = ("admins", "students", "teachers", "courses", "grades")
+
+logger = logging.getLogger(__name__)
+
+
+def _env_int(name, default=None):
+    # 未设置时返回默认值；显式设为0时返回0
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def _env_bool(name):
+    value = os.getenv(name)
+    if value is None:
+        return None
+    return value.lower() in ("1", "true", "yes", "on")
+
+
+# 缓存配置：容量为0时不缓存
+cache_config = {
+    "entity_size": _env_int("ENTITY_CACHE_SIZE", 4096),
+    "entity_ttl": _env_int("ENTITY_CACHE_TTL", 60),
+    "summary_size": _env_int("SUMMARY_CACHE_SIZE", 50000),
+    "summary_ttl": _env_int("SUMMARY_CACHE_TTL", 600),
+}
+
+
+# 连接池配置，未设置的项沿用SQLAlchemy默认值
+pool_config = {
+    "pool_size": _env_int("DB_POOL_SIZE"),
+    "max_overflow": _env_int("DB_MAX_OVERFLOW"),
+    "pool_recycle": _env_int("DB_POOL_RECYCLE"),
+    "pool_timeout": _env_int("DB_POOL_TIMEOUT"),
+    "pool_pre_ping": _env_bool("DB_POOL_PRE_PING"),
+}
+
+
+# 只读副本配置：DB_REPLICA_URLS 为逗号分隔的连接串，未设置时所有读写都走主库
+replica_config = {
+    "urls": [
+        u.strip() for u in os.getenv("DB_REPLICA_URLS", "").split(",") if u.strip()
+    ],
+    # 健康检查间隔（秒）
+    "check_interval": _env_int("DB_REPLICA_CHECK_INTERVAL", 5),
+    # 用户写入后多少秒内的读取仍走主库，应大于副本的复制延迟
+    "sticky_seconds": _env_int("DB_REPLICA_STICKY_SECONDS", 5),
+}
 
 
 # 管理员表
@@ -45,9 +139,9 @@ class Teacher(Base):
 class Course(Base):
     __tablename__ = "courses"
     cno = Column(String(20), primary_key=True)
-    cname = Column(String(50), nullable=False)
+    cname = Column(String(50), nullable=False, unique=True)
     credit = Column(Integer, nullable=False)
-    tno = Column(String(20), ForeignKey("teachers.tno"))
+    tno = Column(String(20), ForeignKey("teachers.tno"), index=True)
     term = Column(String(20), nullable=True)
     teacher = relationship("Teacher", back_populates="courses")
     grades = relationship("Grade", back_populates="course")
@@ -63,6 +157,45 @@ class Grade(Base):
     grade = Column(Integer, nullable=True)
     student = relationship("Student", back_populates="grades")
     course = relationship("Course", back_populates="grades")
+    __table_args__ = (
+        # 同一学生同一课程同一学期只能有一条成绩
+        UniqueConstraint("sno", "cno", "term", name="uq_grades_sno_cno_term"),
+        # 按学生/课程查成绩时通常带学期条件
+        Index("ix_grades_sno_term", "sno", "term"),
+        Index("ix_grades_cno_term", "cno", "term"),
+        # SQLite 默认会复用最大的已删除id，成绩归档后新成绩会与归档成绩id重复
+        {"sqlite_autoincrement": True},
+    )
+
+
+# 归档成绩表：已结束学期的成绩由 archive_term 整体移入，保留原成绩id；
+# 只读不改，不设外键，删除学生或课程时归档记录保持原样
+class GradeArchive(Base):
+    __tablename__ = "grades_archive"
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    sno = Column(String(20))
+    cno = Column(String(20))
+    term = Column(String(20), nullable=False)
+    grade = Column(Integer, nullable=True)
+    __table_args__ = (
+        Index("ix_grades_archive_sno_term", "sno", "term"),
+        Index("ix_grades_archive_cno_term", "cno", "term"),
+    )
+
+
+# 当前成绩与归档成绩的并集，列与成绩表一致，需要包含历史学期时代替Grade查询
+ALL_GRADES = aliased(
+    Grade,
+    union_all(select(*Grade.__table__.c), select(*GradeArchive.__table__.c)).subquery(
+        "all_grades"
+    ),
+    adapt_on_names=True,
+)
+
+
+def grade_source(include_archive=False):
+    # 默认只查当前成绩表
+    return ALL_GRADES if include_archive else Grade
 
 
 # 评论表（保留）
@@ -72,24 +205,425 @@ class Comment(Base):
     name = Column(String(50), nullable=False)
     content = Column(String(500), nullable=False)
     timestamp = Column(DateTime, default=datetime.now)
+    __table_args__ = (
+        # 留言板按时间倒序分页，id用于同一时间戳内排序
+        Index("ix_comments_timestamp_id", "timestamp", "id"),
+    )
 
 
-class DatabaseManager:
-    def __init__(self, database_url=conn_str):
-        self.engine = create_engine(database_url)
-        # 先清空所有表（开发环境用）
-        Base.metadata.drop_all(self.engine)
-        Base.metadata.create_all(self.engine)
-        Session = sessionmaker(bind=self.engine)
-        self.session = Session()
-
-        # 自动插入默认管理员账号
-        if not self.session.query(Admin).first():
-            default_admin = Admin(
-                ano="admin", aname="超级管理员", password=self.hash_password("123456")
+# 计数表，维护需要O(1)读取的计数（如留言总数），与数据写入在同一事务中更新
+class Counter(Base):
+    __tablename__ = "counters"
+    name = Column(String(50), primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+
+
+def version_counter(table):
+    return f"version:{table}"
+
+
+# 课程成绩汇总表：选课人数、已出成绩人数、成绩总和、及格人数，
+# 由成绩的增删改在同一事务中增量维护，课程列表直接读取，不再现算聚合
+class CourseStat(Base):
+    __tablename__ = "course_stats"
+    cno = Column(String(20), ForeignKey("courses.cno"), primary_key=True)
+    enrolled = Column(Integer, nullable=False, default=0)
+    graded = Column(Integer, nullable=False, default=0)
+    grade_sum = Column(Integer, nullable=False, default=0)
+    pass_count = Column(Integer, nullable=False, default=0)
+
+
+# 表结构版本记录，由 migrations.py 维护
+class SchemaVersion(Base):
+    __tablename__ = "schema_version"
+    version = Column(Integer, primary_key=True)
+    description = Column(String(100), nullable=False)
+    applied_at = Column(DateTime, default=datetime.now)
+
+
+# 及格线
+PASSING_GRADE = 60
+
+# 百分制成绩对应的绩点（分数下限, 绩点），从高到低
+GRADE_POINTS = [
+    (90, 4.0),
+    (85, 3.7),
+    (81, 3.3),
+    (78, 3.0),
+    (75, 2.7),
+    (72, 2.3),
+    (68, 2.0),
+    (64, 1.5),
+    (60, 1.0),
+]
+
+
+# 学生成绩查询语句和成绩单的组装，DatabaseManager 与 AsyncDatabaseManager 共用，
+# 同步和异步接口返回的内容保持一致
+def student_grades_select(sno, term=None, cno=None, include_archive=False):
+    G = grade_source(include_archive)
+    query = (
+        select(G.sno, Course.cname, G.cno, G.term, G.grade)
+        .join(Course, G.cno == Course.cno)
+        .where(G.sno == sno)
+    )
+    if term:
+        query = query.where(G.term == term)
+    if cno:
+        query = query.where(G.cno == cno)
+    return query
+
+
+def transcript_select(sno, term=None, cno=None, include_archive=False):
+    # 成绩与课程一次连接查询取出，不再逐条查询课程；
+    # include_archive 为真时一并查询已归档学期的成绩
+    G = grade_source(include_archive)
+    query = (
+        select(G.cno, Course.cname, Course.credit, G.grade, G.term)
+        .join(Course, G.cno == Course.cno)
+        .where(G.sno == sno)
+        .order_by(G.term, G.cno)
+    )
+    if term:
+        query = query.where(G.term == term)
+    if cno:
+        query = query.where(G.cno == cno)
+    return query
+
+
+def build_transcript(rows):
+    # 由 transcript_select 的结果计算已修学分、已获学分和加权平均分
+    courses_and_credits = []
+    credits_attempted = 0  # 已出成绩的课程学分
+    credits_earned = 0  # 及格课程学分
+    weighted_sum = 0  # 学分加权成绩之和
+    for row in rows:
+        courses_and_credits.append(
+            {
+                "cno": row.cno,  # 课程编号
+                "course_name": row.cname,  # 课程名称
+                "credits": row.credit,  # 学分
+                "grade": row.grade,  # 成绩
+                "term": row.term,  # 学期
+            }
+        )
+        if row.grade is None:
+            continue
+        credits_attempted += row.credit
+        weighted_sum += row.grade * row.credit
+        if row.grade >= PASSING_GRADE:
+            credits_earned += row.credit
+
+    return {
+        "grades": courses_and_credits,
+        "credits_attempted": credits_attempted,
+        "credits_earned": credits_earned,
+        "weighted_average": (
+            round(weighted_sum / credits_attempted, 2) if credits_attempted else None
+        ),
+    }
+
+
+# 课程成绩统计中计算的百分位数
+STAT_PERCENTILES = (10, 25, 50, 75, 90)
+
+
+def _percentile(sorted_values, p):
+    # 线性插值计算百分位数，sorted_values须已升序排列
+    pos = (len(sorted_values) - 1) * p / 100
+    low = math.floor(pos)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (pos - low)
+
+
+def _grade_deltas(grade, sign=1):
+    # 一条成绩对课程汇总各列的贡献，sign=-1 表示撤销
+    return {
+        "enrolled": sign,
+        "graded": sign if grade is not None else 0,
+        "grade_sum": sign * (grade or 0),
+        "pass_count": sign if grade is not None and grade >= PASSING_GRADE else 0,
+    }
+
+
+def rebuild_course_stats(conn):
+    """按成绩表和归档成绩表重新计算全部课程汇总，修正增量维护产生的偏差；返回课程数"""
+    G = ALL_GRADES
+    conn.execute(delete(CourseStat))
+    stats = (
+        select(
+            Course.cno,
+            func.count(G.id),
+            func.count(G.grade),
+            func.coalesce(func.sum(G.grade), 0),
+            func.coalesce(func.sum(case((G.grade >= PASSING_GRADE, 1), else_=0)), 0),
+        )
+        .select_from(Course)
+        .outerjoin(G, G.cno == Course.cno)
+        .group_by(Course.cno)
+    )
+    result = conn.execute(
+        insert(CourseStat).from_select(
+            ["cno", "enrolled", "graded", "grade_sum", "pass_count"], stats
+        )
+    )
+    return result.rowcount
+
+
+# 列表接口返回的列（不包含密码）；只投影这些列，返回轻量的Row而非ORM对象
+LIST_COLUMNS = {
+    "admins": (Admin.ano, Admin.aname),
+    "students": (
+        Student.sno,
+        Student.sname,
+        Student.smajor,
+        Student.sclass,
+        Student.sex,
+        Student.birthday,
+    ),
+    "courses": (Course.cno, Course.cname, Course.credit, Course.tno, Course.term),
+    "teachers": (Teacher.tno, Teacher.tname, Teacher.tdept),
+    "grades": (Grade.id, Grade.sno, Grade.cno, Grade.term, Grade.grade),
+}
+
+# 课程列表附带的汇总列，外连接汇总表，没有汇总行的课程为None
+COURSE_STAT_COLUMNS = (
+    CourseStat.enrolled,
+    CourseStat.graded,
+    CourseStat.grade_sum,
+    CourseStat.pass_count,
+)
+
+# 可导出的表及导出列
+EXPORT_COLUMNS = {t: LIST_COLUMNS[t] for t in ("students", "courses", "grades")}
+
+
+# 容量有限、条目带过期时间的LRU缓存，线程安全；不缓存None。
+# 条目可带版本号（如表版本号），读取时传入版本号则只返回同一版本号下写入的条目
+class LRUCache:
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (过期时间, 版本号, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, version=None):
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if (
+                item is None
+                or item[0] <= now
+                or (version is not None and item[1] != version)
+            ):
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[2]
+
+    def set(self, key, value, version=None):
+        if self.maxsize <= 0 or value is None:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, version, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / total, 4) if total else None,
+            }
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+# 统计代码块内通过engine执行的SQL语句，用于发现N+1查询；
+# 可作为上下文管理器或装饰器使用，指定budget时超出预算抛出QueryBudgetExceeded
+class QueryCounter(ContextDecorator):
+    def __init__(self, engine, budget=None):
+        # engine 可以是单个engine，也可以是engine列表（主库和只读副本）
+        self.engines = list(engine) if isinstance(engine, (list, tuple)) else [engine]
+        self.budget = budget
+        self.statements = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def __enter__(self):
+        self.statements = []
+        for engine in self.engines:
+            event.listen(engine, "after_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        for engine in self.engines:
+            event.remove(engine, "after_cursor_execute", self._record)
+        if exc_type is None and self.budget is not None and self.count > self.budget:
+            raise QueryBudgetExceeded(
+                f"执行了{self.count}条SQL，超出预算{self.budget}条：\n"
+                + "\n".join(" ".join(s.split()) for s in self.statements)
             )
-            self.session.add(default_admin)
-            self.session.commit()
+        return False
+
+
+# 只读副本：独立的engine和线程会话，按间隔用 SELECT 1 检查是否可用
+class Replica:
+    def __init__(self, url, check_interval, **options):
+        self.engine = create_engine(url, **options)
+        self.session = scoped_session(sessionmaker(bind=self.engine))
+        self.check_interval = check_interval
+        self.healthy = True
+        self.checked_at = None
+
+    def is_healthy(self):
+        now = time.monotonic()
+        if self.checked_at is None or now - self.checked_at >= self.check_interval:
+            self.checked_at = now
+            try:
+                with self.engine.connect() as conn:
+                    conn.execute(text("SELECT 1"))
+                healthy = True
+            except SQLAlchemyError:
+                healthy = False
+            if healthy != self.healthy:
+                logger.warning(
+                    "只读副本 %s %s",
+                    self.engine.url.render_as_string(hide_password=True),
+                    "已恢复" if healthy else "不可用，读取改走其它副本或主库",
+                )
+            self.healthy = healthy
+        return self.healthy
+
+
+class DatabaseManager:
+    def __init__(
+        self, database_url=conn_str, mode=None, replica_urls=None, **pool_options
+    ):
+        options = {**pool_config, **pool_options}
+        options = {k: v for k, v in options.items() if v is not None}
+        self.engine = create_engine(database_url, **options)
+        # 每个线程（即每个请求）使用独立的会话，请求结束时由remove_session回收
+        primary_factory = sessionmaker(bind=self.engine)
+        self.session = scoped_session(primary_factory)
+
+        # 只读副本：只读方法通过 read_session 轮询分发到健康的副本；
+        # 写入以及同一请求中写入之后的读取走主库
+        if replica_urls is None:
+            replica_urls = replica_config["urls"]
+        self.replicas = [
+            Replica(url, replica_config["check_interval"], **options)
+            for url in replica_urls
+        ]
+        self.replica_sticky_seconds = replica_config["sticky_seconds"]
+        self._replica_turn = itertools.count()
+        self._local = threading.local()
+        event.listen(primary_factory, "after_commit", self._mark_written)
+
+        # 按主键查询管理员、学生、教师、课程的读穿透缓存，本进程修改或删除时失效，
+        # 传入表版本号时其它进程的修改也立即生效；登录和密码校验不使用缓存。
+        # 缓存的是已脱离会话的对象，只能读取列属性，不能访问关联关系
+        self._entity_cache = LRUCache(
+            cache_config["entity_size"], cache_config["entity_ttl"]
+        )
+        self._lookup_session = sessionmaker(bind=self.engine)
+
+        # 学生学分绩点汇总缓存，条目带成绩表和课程表的版本号，版本号变化即失效
+        self._summary_cache = LRUCache(
+            cache_config["summary_size"], cache_config["summary_ttl"]
+        )
+
+        mode = mode or init_mode
+        if mode == "reset":
+            # 清空所有表（开发环境用）
+            Base.metadata.drop_all(self.engine)
+        if mode in ("ensure", "reset"):
+            self._ensure_schema()
+            self._ensure_initial_data()
+
+    def _ensure_schema(self):
+        # 只创建缺失的表（及新表上的索引），已有表保持不变；
+        # 全新的库直接记为最新版本，已有的库需要运行 migrations.py 升级
+        fresh = not inspect(self.engine).has_table(Student.__tablename__)
+        try:
+            Base.metadata.create_all(self.engine)
+        except SQLAlchemyError:
+            # 多个进程同时启动时可能并发建表，重试一次即可跳过已建好的表
+            Base.metadata.create_all(self.engine)
+
+        with self._lookup_session() as session:
+            version = session.query(func.max(SchemaVersion.version)).scalar()
+            if version is None and fresh:
+                session.add(SchemaVersion(version=SCHEMA_VERSION, description="初始化"))
+                try:
+                    session.commit()
+                except SQLAlchemyError:
+                    session.rollback()
+            elif (version or 0) < SCHEMA_VERSION:
+                logger.warning(
+                    "数据库表结构版本为 %s，低于 %s，请运行 python migrations.py upgrade",
+                    version or 0,
+                    SCHEMA_VERSION,
+                )
+
+    def _ensure_initial_data(self):
+        # 默认管理员账号、留言计数和表版本号；多个进程同时插入时忽略主键冲突
+        with self._lookup_session() as session:
+            try:
+                if not session.query(Admin).first():
+                    session.add(
+                        Admin(
+                            ano="admin",
+                            aname="超级管理员",
+                            password=self.hash_password("123456"),
+                        )
+                    )
+                    session.commit()
+                if not session.get(Counter, "comments"):
+                    count = session.query(func.count(Comment.id)).scalar()
+                    session.add(Counter(name="comments", value=count))
+                    session.commit()
+                existing = {
+                    name
+                    for (name,) in session.query(Counter.name).filter(
+                        Counter.name.in_(version_counter(t) for t in VERSIONED_TABLES)
+                    )
+                }
+                for table in VERSIONED_TABLES:
+                    if version_counter(table) not in existing:
+                        session.add(Counter(name=version_counter(table), value=0))
+                session.commit()
+            except SQLAlchemyError:
+                session.rollback()
 
     def hash_password(self, password):
         return hashlib.sha256(password.encode()).hexdigest()
@@ -104,6 +638,7 @@ class DatabaseManager:
                 return False, "管理员编号已存在"
             admin = Admin(ano=ano, aname=aname, password=self.hash_password(password))
             self.session.add(admin)
+            self._bump_version("admins")
             self.session.commit()
             return True, "添加成功"
         except Exception as e:
@@ -119,7 +654,9 @@ class DatabaseManager:
                 admin.aname = aname
             if password:
                 admin.password = self.hash_password(password)
+            self._bump_version("admins")
             self.session.commit()
+            self._entity_cache.pop(("admins", ano))
             return True, "更新成功"
         except Exception as e:
             self.session.rollback()
@@ -131,34 +668,33 @@ class DatabaseManager:
             if not admin:
                 return False, "管理员不存在"
             self.session.delete(admin)
+            self._bump_version("admins")
             self.session.commit()
+            self._entity_cache.pop(("admins", ano))
             return True, "删除成功"
         except Exception as e:
             self.session.rollback()
             return False, f"删除失败: {str(e)}"
 
     def get_admin(self, ano):
-        return self.session.query(Admin).filter_by(ano=ano).first()
+        return self._cached_get(Admin, ano)
 
     def get_all_admins(self):
-        return self.session.query(Admin).all()
+        return self.read_session.query(*LIST_COLUMNS["admins"]).all()
 
     def admin_login(self, ano, password):
-        admin = self.get_admin(ano)
+        admin = self._load(Admin, ano)
         if admin and self.verify_password(password, admin.password):
             return True, admin
         return False, None
 
     def change_password(self, sno, old_password, new_password):
-        student = self.get_student(sno)
-        if not student or not self.verify_password(old_password, student.password):
+        success, _ = self.student_login(sno, old_password)
+        if not success:
             return False, "原密码错误"
 
-        # 密码加密
-        encrypted_new_password = self.hash_password(new_password)
-
-        # 更新密码
-        success = self.update_student_password(sno, encrypted_new_password)
+        # 更新密码（update_student 中加密）
+        success, _ = self.update_student(sno, password=new_password)
         if success:
             return True, "密码修改成功"
         return False, "密码修改失败"
@@ -180,6 +716,7 @@ class DatabaseManager:
                 password=self.hash_password(password),
             )
             self.session.add(student)
+            self._bump_version("students")
             self.session.commit()
             return True, "操作成功"
         except Exception as e:
@@ -195,7 +732,9 @@ class DatabaseManager:
                 if k == "password":
                     v = self.hash_password(v)
                 setattr(student, k, v)
+            self._bump_version("students")
             self.session.commit()
+            self._entity_cache.pop(("students", sno))
             return True, "更新成功"
         except Exception as e:
             self.session.rollback()
@@ -207,20 +746,32 @@ class DatabaseManager:
             if not student:
                 return False, "学生不存在"
             self.session.delete(student)
+            # 删除学生时其成绩的学号被置空，成绩表也随之变化
+            self._bump_version("students", "grades")
             self.session.commit()
+            self._entity_cache.pop(("students", sno))
             return True, "删除成功"
         except Exception as e:
             self.session.rollback()
             return False, f"删除失败: {str(e)}"
 
-    def get_student(self, sno):
-        return self.session.query(Student).filter_by(sno=sno).first()
+    def get_student(self, sno, cached=True, version=None):
+        # 按表版本号生成ETag的接口传入 version（学生表版本号），
+        # 避免把本进程缓存中的旧数据和其它进程写入后的新版本号一起返回
+        if not cached:
+            return self.read_session.get(Student, sno)
+        return self._cached_get(Student, sno, version)
 
     def get_all_students(self):
-        return self.session.query(Student).all()
+        return self.read_session.query(Student).all()
+
+    def get_students_page(self, after=None, limit=100):
+        query = self.read_session.query(*LIST_COLUMNS["students"])
+        return self._keyset_page(query, Student.sno, after, limit)
 
     def student_login(self, sno, password):
-        student = self.get_student(sno)
+        # 直接读主库：其它进程刚修改的密码或删除的账号立即生效
+        student = self._load(Student, sno)
         if student and self.verify_password(password, student.password):
             return True, student
         return False, None
@@ -236,6 +787,7 @@ class DatabaseManager:
                 tno=tno, tname=tname, tdept=tdept, password=self.hash_password(password)
             )
             self.session.add(teacher)
+            self._bump_version("teachers")
             self.session.commit()
             return True, "操作成功"
         except Exception as e:
@@ -251,7 +803,9 @@ class DatabaseManager:
                 if k == "password":
                     v = self.hash_password(v)
                 setattr(teacher, k, v)
+            self._bump_version("teachers")
             self.session.commit()
+            self._entity_cache.pop(("teachers", tno))
             return True, "更新成功"
         except Exception as e:
             self.session.rollback()
@@ -263,20 +817,28 @@ class DatabaseManager:
             if not teacher:
                 return False, "教师不存在"
             self.session.delete(teacher)
+            self._bump_version("teachers", "courses")
             self.session.commit()
+            self._entity_cache.pop(("teachers", tno))
             return True, "删除成功"
         except Exception as e:
             self.session.rollback()
             return False, f"删除失败: {str(e)}"
 
-    def get_teacher(self, tno):
-        return self.session.query(Teacher).filter_by(tno=tno).first()
+    def get_teacher(self, tno, cached=True, version=None):
+        if not cached:
+            return self.read_session.get(Teacher, tno)
+        return self._cached_get(Teacher, tno, version)
 
     def get_all_teachers(self):
-        return self.session.query(Teacher).all()
+        return self.read_session.query(Teacher).all()
+
+    def get_teachers_page(self, after=None, limit=100):
+        query = self.read_session.query(*LIST_COLUMNS["teachers"])
+        return self._keyset_page(query, Teacher.tno, after, limit)
 
     def teacher_login(self, tno, password):
-        teacher = self.get_teacher(tno)
+        teacher = self._load(Teacher, tno)
         if teacher and self.verify_password(password, teacher.password):
             return True, teacher
         return False, None
@@ -286,10 +848,14 @@ class DatabaseManager:
         try:
             if self.session.query(Course).filter_by(cno=cno).first():
                 return False, "课程编号已存在"
+            if self.session.query(Course).filter_by(cname=cname).first():
+                return False, "课程名称已存在"
             if not self.get_teacher(tno):
                 return False, "教师不存在"
             course = Course(cno=cno, cname=cname, credit=credit, tno=tno, term=term)
             self.session.add(course)
+            self.session.add(CourseStat(cno=cno))
+            self._bump_version("courses")
             self.session.commit()
             return True, "添加成功"
         except Exception as e:
@@ -303,7 +869,10 @@ class DatabaseManager:
                 return False, "课程不存在"
             for k, v in kwargs.items():
                 setattr(course, k, v)
+            self._bump_version("courses")
             self.session.commit()
+            self._entity_cache.pop(("courses", cno))
+            # 学分变化会影响所有选课学生的汇总
             return True, "更新成功"
         except Exception as e:
             self.session.rollback()
@@ -314,18 +883,37 @@ class DatabaseManager:
             course = self.session.query(Course).filter_by(cno=cno).first()
             if not course:
                 return False, "课程不存在"
+            self.session.execute(delete(CourseStat).where(CourseStat.cno == cno))
             self.session.delete(course)
+            self._bump_version("courses", "grades")
             self.session.commit()
+            self._entity_cache.pop(("courses", cno))
             return True, "删除成功"
         except Exception as e:
             self.session.rollback()
             return False, f"删除失败: {str(e)}"
 
     def get_course(self, cno):
-        return self.session.query(Course).filter_by(cno=cno).first()
+        return self._cached_get(Course, cno)
 
     def get_all_courses(self):
-        return self.session.query(Course).all()
+        return self.read_session.query(Course).all()
+
+    def get_courses_page(self, after=None, limit=100):
+        query = self.read_session.query(
+            *LIST_COLUMNS["courses"], *COURSE_STAT_COLUMNS
+        ).outerjoin(CourseStat, CourseStat.cno == Course.cno)
+        return self._keyset_page(query, Course.cno, after, limit)
+
+    def get_courses_by_teacher(self, tno):
+        # 教师名下的课程及成绩汇总
+        return (
+            self.read_session.query(*LIST_COLUMNS["courses"], *COURSE_STAT_COLUMNS)
+            .outerjoin(CourseStat, CourseStat.cno == Course.cno)
+            .filter(Course.tno == tno)
+            .order_by(Course.cno)
+            .all()
+        )
 
     # ---------------- 成绩相关 ----------------
     def add_grade(self, sno, cno, term, grade):
@@ -334,20 +922,119 @@ class DatabaseManager:
                 return False, "学生不存在"
             if not self.get_course(cno):
                 return False, "课程不存在"
+            if self._term_archived(cno, term):
+                return False, "该课程本学期成绩已归档，不能再录入"
+            if (
+                self.session.query(Grade.id)
+                .filter_by(sno=sno, cno=cno, term=term)
+                .first()
+            ):
+                return False, "该学生本学期该课程成绩已存在"
             grade_obj = Grade(sno=sno, cno=cno, term=term, grade=grade)
             self.session.add(grade_obj)
+            self._adjust_course_stats(cno, _grade_deltas(grade))
+            self._bump_version("grades")
             self.session.commit()
             return True, "成绩添加成功"
         except Exception as e:
             self.session.rollback()
             return False, f"添加失败: {str(e)}"
 
+    def add_grades(self, cno, term, items, batch_size=1000):
+        # 一门课程一个学期的成绩批量录入：学号用一次IN查询校验，
+        # 合法的成绩在同一个事务中批量插入，不合法的逐行返回原因
+        if not isinstance(cno, str) or not isinstance(term, str):
+            return False, "参数格式错误"
+        errors = []
+        valid = []
+        seen = set()
+        for i, item in enumerate(items, 1):
+            sno = item.get("sno")
+            grade = item.get("grade")
+            if not sno or grade is None:
+                errors.append({"row": i, "sno": sno, "message": "参数不完整"})
+                continue
+            # 学号须为字符串、成绩须为数字，否则去重和查询时会出错
+            if not isinstance(sno, str):
+                errors.append({"row": i, "sno": None, "message": "学号格式错误"})
+                continue
+            if isinstance(grade, bool) or not isinstance(grade, (int, float, str)):
+                errors.append({"row": i, "sno": sno, "message": "成绩必须是数字"})
+                continue
+            try:
+                grade = int(grade)
+            except (TypeError, ValueError, OverflowError):
+                errors.append({"row": i, "sno": sno, "message": "成绩必须是数字"})
+                continue
+            if grade < 0 or grade > 100:
+                errors.append({"row": i, "sno": sno, "message": "成绩必须在0-100之间"})
+                continue
+            if sno in seen:
+                errors.append({"row": i, "sno": sno, "message": "学号重复"})
+                continue
+            seen.add(sno)
+            valid.append((i, {"sno": sno, "cno": cno, "term": term, "grade": grade}))
+
+        try:
+            if not self.get_course(cno):
+                return False, "课程不存在"
+            if self._term_archived(cno, term):
+                return False, "该课程本学期成绩已归档，不能再录入"
+            # 学生是否存在、是否已有本课程本学期成绩，在同一个IN查询中一并得到
+            snos = [values["sno"] for _, values in valid]
+            students = {}
+            for n in range(0, len(snos), batch_size):
+                chunk = snos[n : n + batch_size]
+                query = (
+                    self.session.query(Student.sno, Grade.id)
+                    .outerjoin(
+                        Grade,
+                        (Grade.sno == Student.sno)
+                        & (Grade.cno == cno)
+                        & (Grade.term == term),
+                    )
+                    .filter(Student.sno.in_(chunk))
+                )
+                students.update(query)
+            to_insert = []
+            for i, values in valid:
+                if values["sno"] not in students:
+                    message = "学生不存在"
+                elif students[values["sno"]] is not None:
+                    message = "成绩已存在"
+                else:
+                    to_insert.append(values)
+                    continue
+                errors.append({"row": i, "sno": values["sno"], "message": message})
+            for n in range(0, len(to_insert), batch_size):
+                self.session.execute(insert(Grade), to_insert[n : n + batch_size])
+            if to_insert:
+                deltas = {"enrolled": 0, "graded": 0, "grade_sum": 0, "pass_count": 0}
+                for values in to_insert:
+                    for column, delta in _grade_deltas(values["grade"]).items():
+                        deltas[column] += delta
+                self._adjust_course_stats(cno, deltas)
+                self._bump_version("grades")
+            self.session.commit()
+        except Exception as e:
+            self.session.rollback()
+            return False, f"添加失败: {str(e)}"
+
+        errors.sort(key=lambda e: e["row"])
+        return True, {"inserted": len(to_insert), "errors": errors}
+
     def update_grade(self, grade_id, grade):
         try:
             grade_obj = self.session.query(Grade).filter_by(id=grade_id).first()
             if not grade_obj:
                 return False, "成绩记录不存在"
+            if grade_obj.cno:
+                deltas = _grade_deltas(grade)
+                for column, delta in _grade_deltas(grade_obj.grade, -1).items():
+                    deltas[column] += delta
+                self._adjust_course_stats(grade_obj.cno, deltas)
             grade_obj.grade = grade
+            self._bump_version("grades")
             self.session.commit()
             return True, "成绩更新成功"
         except Exception as e:
@@ -359,93 +1046,552 @@ class DatabaseManager:
             grade_obj = self.session.query(Grade).filter_by(id=grade_id).first()
             if not grade_obj:
                 return False, "成绩记录不存在"
+            if grade_obj.cno:
+                self._adjust_course_stats(
+                    grade_obj.cno, _grade_deltas(grade_obj.grade, -1)
+                )
             self.session.delete(grade_obj)
+            self._bump_version("grades")
             self.session.commit()
             return True, "删除成功"
         except Exception as e:
             self.session.rollback()
             return False, f"删除失败: {str(e)}"
 
+    def update_student_grade(self, sno, cno, term, grade):
+        # 录入成绩：该学生本学期已有该课程成绩时修改，否则新增
+        grade_id = (
+            self.session.query(Grade.id).filter_by(sno=sno, cno=cno, term=term).scalar()
+        )
+        if grade_id is None:
+            return self.add_grade(sno, cno, term, grade)
+        return self.update_grade(grade_id, grade)
+
+    def get_students_by_course(self, cno):
+        # 选修该课程的学生及成绩，成绩与学生一次连接查询
+        return (
+            self.read_session.query(
+                Student.sno,
+                Student.sname,
+                Student.smajor,
+                Course.cname,
+                Grade.term,
+                Grade.grade.label("igrade"),
+            )
+            .join(Grade, Grade.sno == Student.sno)
+            .join(Course, Grade.cno == Course.cno)
+            .filter(Grade.cno == cno)
+            .order_by(Student.sno, Grade.term)
+            .all()
+        )
+
     def get_grade(self, grade_id):
-        return self.session.query(Grade).filter_by(id=grade_id).first()
+        return self.read_session.query(Grade).filter_by(id=grade_id).first()
 
-    def get_grades_by_student(self, sno, term=None, cno=None):
-        # 先查询成绩表中该学生的成绩记录
-        query = self.session.query(Grade).filter_by(sno=sno)
+    def get_student_grades(self, sno, term=None, cno=None, include_archive=False):
+        query = student_grades_select(sno, term, cno, include_archive)
+        return self.read_session.execute(query).all()
 
-        # 如果提供了学期，添加学期过滤条件
-        if term:
-            query = query.filter_by(term=term)
+    def get_grades_by_student(self, sno, term=None, cno=None, include_archive=False):
+        query = transcript_select(sno, term, cno, include_archive)
+        return build_transcript(self.read_session.execute(query))
 
-        # 如果提供了课程编号，添加课程编号过滤条件
-        if cno:
-            query = query.filter_by(cno=cno)
-
-        # 执行查询，获取学生的所有成绩记录
-        grades = query.all()
-
-        # 获取成绩对应的课程信息（课程名和学分）
-        courses_and_credits = []
-        for grade in grades:
-            course = self.session.query(Course).filter_by(cno=grade.cno).first()
-            if course:
-                courses_and_credits.append(
-                    {
-                        "course_name": course.cname,  # 课程名称
-                        "credits": course.credit,  # 学分
-                        "grade": grade.grade,  # 成绩
-                        "term": grade.term,  # 学期
-                    }
+    # ---------------- 学分绩点汇总 ----------------
+    def get_student_summary(self, sno, version=None):
+        # version 为读取数据前的成绩表和课程表版本号，缓存条目只在版本号不变时命中，
+        # 任何进程修改成绩或课程后都不会返回旧的汇总；未传入版本号时直接计算
+        if version is None:
+            return self._compute_student_summary(sno)
+        summary = self._summary_cache.get(sno, version)
+        if summary is None:
+            summary = self._compute_student_summary(sno)
+            self._summary_cache.set(sno, summary, version)
+        return summary
+
+    def _compute_student_summary(self, sno):
+        # 按学期分组在数据库中汇总学分、加权成绩和绩点，未出成绩的课程不计入；
+        # 总绩点需要全部学期的成绩，包含已归档的学期
+        G = ALL_GRADES
+        graded_credit = case((G.grade.isnot(None), Course.credit), else_=0)
+        earned_credit = case((G.grade >= PASSING_GRADE, Course.credit), else_=0)
+        grade_point = case(
+            *[(G.grade >= low, point) for low, point in GRADE_POINTS], else_=0
+        )
+        rows = (
+            self.session.query(
+                G.term,
+                func.sum(graded_credit).label("attempted"),
+                func.sum(earned_credit).label("earned"),
+                func.sum(G.grade * Course.credit).label("weighted_grade"),
+                func.sum(grade_point * graded_credit).label("weighted_point"),
+            )
+            .join(Course, G.cno == Course.cno)
+            .filter(G.sno == sno)
+            .group_by(G.term)
+            .order_by(G.term)
+            .all()
+        )
+
+        def average(total, credits):
+            return round(total / credits, 2) if credits else None
+
+        terms = []
+        attempted = earned = weighted_grade = weighted_point = 0
+        for row in rows:
+            terms.append(
+                {
+                    "term": row.term,
+                    "credits_attempted": row.attempted or 0,
+                    "credits_earned": row.earned or 0,
+                    "weighted_average": average(row.weighted_grade, row.attempted),
+                    "gpa": average(row.weighted_point, row.attempted),
+                }
+            )
+            attempted += row.attempted or 0
+            earned += row.earned or 0
+            weighted_grade += row.weighted_grade or 0
+            weighted_point += row.weighted_point or 0
+
+        return {
+            "credits_attempted": attempted,
+            "credits_earned": earned,
+            "weighted_average": average(weighted_grade, attempted),
+            "gpa": average(weighted_point, attempted),
+            "terms": terms,
+        }
+
+    # ---------------- 课程成绩汇总 ----------------
+    def _adjust_course_stats(self, cno, deltas):
+        # 在当前事务内累加课程汇总，由调用方提交；
+        # 课程还没有汇总行（如直接写库导入的课程）时插入一行
+        deltas = {k: v for k, v in deltas.items() if v}
+        if not deltas:
+            return
+        result = self.session.execute(
+            update(CourseStat)
+            .where(CourseStat.cno == cno)
+            .values({k: getattr(CourseStat, k) + v for k, v in deltas.items()})
+        )
+        if result.rowcount == 0:
+            self.session.add(CourseStat(cno=cno, **deltas))
+
+    def rebuild_course_stats(self):
+        # 重算全部课程汇总并更新课程表版本号，返回课程数
+        with self.engine.begin() as conn:
+            count = rebuild_course_stats(conn)
+            conn.execute(
+                update(Counter)
+                .where(Counter.name == version_counter("courses"))
+                .values(value=Counter.value + 1)
+            )
+        return count
+
+    # ---------------- 成绩归档 ----------------
+    def _term_archived(self, cno, term):
+        # 学期归档后即关闭，不再录入成绩，否则与归档表中的成绩重复计算
+        query = self.session.query(GradeArchive.id).filter_by(cno=cno, term=term)
+        return query.first() is not None
+
+    def archive_term(self, term):
+        # 已结束学期的成绩整体移入归档表，INSERT ... SELECT 与 DELETE 在同一事务中；
+        # 课程汇总和学分绩点汇总本就包含归档成绩，不需要调整
+        try:
+            columns = list(Grade.__table__.c)
+            self.session.execute(
+                insert(GradeArchive).from_select(
+                    [c.name for c in columns],
+                    select(*columns).where(Grade.term == term),
                 )
+            )
+            result = self.session.execute(delete(Grade).where(Grade.term == term))
+            if result.rowcount:
+                self._bump_version("grades")
+            self.session.commit()
+            return True, {"term": term, "archived": result.rowcount}
+        except Exception as e:
+            self.session.rollback()
+            return False, f"归档失败: {str(e)}"
 
-        return courses_and_credits
+    # ---------------- 课程成绩统计 ----------------
+    def get_course_stats(self, tno, cno=None, term=None, include_archive=False):
+        G = grade_source(include_archive)
 
-    def get_grades_by_teacher(self, tno, term=None, cno=None, sno=None):
-        # 查询该教师所授课程的成绩
-        courses = self.session.query(Course).filter_by(tno=tno).all()
-        cnos = [c.cno for c in courses]
-        query = self.session.query(Grade).filter(Grade.cno.in_(cnos))
+        # 统计教师所授课程各学期的成绩分布。所有指标取自同一次按成绩排序的
+        # 单列查询，分多次查询时两次查询之间的写入会使计数与百分位数不一致
+        query = (
+            self.read_session.query(G.cno, G.term, Course.cname, G.grade)
+            .join(Course, G.cno == Course.cno)
+            .filter(Course.tno == tno, G.grade.isnot(None))
+        )
+        if cno:
+            query = query.filter(G.cno == cno)
         if term:
-            query = query.filter_by(term=term)
+            query = query.filter(G.term == term)
+        rows = query.order_by(G.cno, G.term, G.grade).all()
+
+        stats = []
+        for (row_cno, row_term, cname), group in itertools.groupby(
+            rows, key=lambda row: row[:3]
+        ):
+            values = [row[3] for row in group]
+            count = len(values)
+            mean = math.fsum(values) / count
+            mean_square = math.fsum(v * v for v in values) / count
+            # 已排序，及格人数和直方图各段人数用二分查找得到
+            bounds = [bisect.bisect_left(values, i * 10) for i in range(10)] + [count]
+            percentiles = {
+                f"p{p}": round(_percentile(values, p), 2) for p in STAT_PERCENTILES
+            }
+            stats.append(
+                {
+                    "cno": row_cno,
+                    "cname": cname,
+                    "term": row_term,
+                    "count": count,
+                    "mean": round(mean, 2),
+                    "median": percentiles["p50"],
+                    "stddev": round(math.sqrt(max(mean_square - mean**2, 0)), 2),
+                    "min": values[0],
+                    "max": values[-1],
+                    "percentiles": percentiles,
+                    "pass_rate": round(
+                        (count - bisect.bisect_left(values, PASSING_GRADE)) / count, 4
+                    ),
+                    "histogram": [
+                        {
+                            "range": f"{i * 10}-{i * 10 + 9 if i < 9 else 100}",
+                            "count": bounds[i + 1] - bounds[i],
+                        }
+                        for i in range(10)
+                    ],
+                }
+            )
+        return stats
+
+    def _teacher_grades_query(
+        self, tno, term=None, cno=None, sno=None, include_archive=False
+    ):
+        # 成绩、课程、学生一次连接查询，按课程的教师工号过滤；
+        # 学生已删除的成绩学号为空，用外连接保留
+        G = grade_source(include_archive)
+        query = (
+            self.read_session.query(
+                G.id,
+                G.sno,
+                Student.sname,
+                G.cno,
+                Course.cname,
+                G.term,
+                G.grade,
+            )
+            .join(Course, G.cno == Course.cno)
+            .outerjoin(Student, G.sno == Student.sno)
+            .filter(Course.tno == tno)
+        )
+        if term:
+            query = query.filter(G.term == term)
         if cno:
-            query = query.filter_by(cno=cno)
+            query = query.filter(G.cno == cno)
         if sno:
-            query = query.filter_by(sno=sno)
-        return query.all()
+            query = query.filter(G.sno == sno)
+        return query
+
+    def get_grades_by_teacher(
+        self, tno, term=None, cno=None, sno=None, include_archive=False
+    ):
+        # 查询该教师所授课程的成绩
+        query = self._teacher_grades_query(tno, term, cno, sno, include_archive)
+        return query.order_by(grade_source(include_archive).id).all()
+
+    def get_teacher_grades_page(
+        self,
+        tno,
+        after=None,
+        limit=100,
+        term=None,
+        cno=None,
+        sno=None,
+        include_archive=False,
+    ):
+        query = self._teacher_grades_query(tno, term, cno, sno, include_archive)
+        key = grade_source(include_archive).id
+        return self._keyset_page(query, key, after, limit)
 
     def get_all_grades(self):
-        return self.session.query(Grade).all()
+        return self.read_session.query(Grade).all()
+
+    def get_grades_page(
+        self,
+        after=None,
+        limit=100,
+        sno=None,
+        cno=None,
+        term=None,
+        include_archive=False,
+    ):
+        G = grade_source(include_archive)
+        query = self.read_session.query(G.id, G.sno, G.cno, G.term, G.grade)
+        if sno:
+            query = query.filter(G.sno == sno)
+        if cno:
+            query = query.filter(G.cno == cno)
+        if term:
+            query = query.filter(G.term == term)
+        return self._keyset_page(query, G.id, after, limit)
+
+    # ---------------- 分页相关 ----------------
+    def _keyset_page(self, query, key, after, limit):
+        # 按主键做游标分页：WHERE key > :after ORDER BY key LIMIT n，
+        # 走主键索引定位，翻到多深的页耗时都一样；多取一行判断是否还有下一页
+        if after is not None:
+            query = query.filter(key > after)
+        rows = query.order_by(key).limit(limit + 1).all()
+        if len(rows) > limit:
+            rows = rows[:limit]
+            return rows, getattr(rows[-1], key.key)
+        return rows, None
+
+    # ---------------- 批量导入 ----------------
+    def bulk_add_students(self, rows, batch_size=1000):
+        return self._bulk_import(
+            Student,
+            rows,
+            fields=("sno", "sname", "smajor", "sclass", "sex", "birthday"),
+            required=("sno", "sname", "smajor"),
+            batch_size=batch_size,
+        )
+
+    def bulk_add_teachers(self, rows, batch_size=1000):
+        return self._bulk_import(
+            Teacher,
+            rows,
+            fields=("tno", "tname", "tdept"),
+            required=("tno", "tname"),
+            batch_size=batch_size,
+        )
+
+    def _bulk_import(self, model, rows, fields, required, batch_size):
+        # rows为字典列表，第一个字段是主键；校验全部在内存中一次完成，
+        # 已存在的主键用IN集合查询，合法行在同一个事务中按批executemany插入
+        start = time.perf_counter()
+        key = fields[0]
+        key_column = getattr(model, key)
+        errors = []
+        valid = []
+        seen = set()
+        for i, row in enumerate(rows, 1):
+            values = {f: (row.get(f) or "").strip() or None for f in fields}
+            missing = [f for f in required if not values[f]]
+            if missing:
+                errors.append({"row": i, "message": f"缺少字段: {', '.join(missing)}"})
+                continue
+            too_long = [
+                f
+                for f in fields
+                if values[f] and len(values[f]) > model.__table__.c[f].type.length
+            ]
+            if too_long:
+                errors.append({"row": i, "message": f"字段过长: {', '.join(too_long)}"})
+                continue
+            if values[key] in seen:
+                errors.append({"row": i, "message": "文件中编号重复"})
+                continue
+            seen.add(values[key])
+            password = (row.get("password") or "").strip() or f"{values[key]}/123456"
+            values["password"] = self.hash_password(password)
+            valid.append((i, values))
+
+        try:
+            existing = set()
+            keys = [values[key] for _, values in valid]
+            for n in range(0, len(keys), batch_size):
+                chunk = keys[n : n + batch_size]
+                query = self.session.query(key_column).filter(key_column.in_(chunk))
+                existing.update(k for (k,) in query)
+            to_insert = []
+            for i, values in valid:
+                if values[key] in existing:
+                    errors.append({"row": i, "message": "编号已存在"})
+                else:
+                    to_insert.append(values)
+            for n in range(0, len(to_insert), batch_size):
+                self.session.execute(insert(model), to_insert[n : n + batch_size])
+            if to_insert:
+                self._bump_version(model.__tablename__)
+            self.session.commit()
+        except Exception as e:
+            self.session.rollback()
+            return False, f"导入失败: {str(e)}"
+
+        elapsed = time.perf_counter() - start
+        errors.sort(key=lambda e: e["row"])
+        return True, {
+            "inserted": len(to_insert),
+            "errors": errors,
+            "seconds": round(elapsed, 3),
+            "rows_per_second": round(len(rows) / elapsed, 1) if elapsed else None,
+        }
+
+    # ---------------- 导出相关 ----------------
+    def iter_export(self, table, batch_size=1000):
+        # 服务端游标逐批读取，只投影需要的列，内存占用与表大小无关
+        columns = EXPORT_COLUMNS[table]
+        query = (
+            self.read_session.query(*columns).order_by(columns[0]).yield_per(batch_size)
+        )
+        for row in query:
+            yield tuple(row)
 
     # ---------------- 评论相关（保留） ----------------
     def add_comment(self, name, content):
         try:
             comment = Comment(name=name, content=content)
             self.session.add(comment)
+            self._increment_counter("comments")
             self.session.commit()
             return True, "留言成功"
         except Exception as e:
             self.session.rollback()
             return False, f"留言失败: {str(e)}"
 
-    def get_comments(self, limit=5, offset=0):
+    def get_comments(self, limit=5, offset=0, before=None):
+        # before为上一页最后一条留言的(时间戳, id)，传入时按游标取下一页，
+        # 借助(timestamp, id)索引直接定位，不再随页数增加而变慢
         try:
-            comments = (
-                self.session.query(Comment)
-                .order_by(Comment.timestamp.desc())
-                .limit(limit)
-                .offset(offset)
-                .all()
+            query = self.read_session.query(Comment).order_by(
+                Comment.timestamp.desc(), Comment.id.desc()
             )
+            if before:
+                timestamp, comment_id = before
+                query = query.filter(
+                    or_(
+                        Comment.timestamp < timestamp,
+                        and_(Comment.timestamp == timestamp, Comment.id < comment_id),
+                    )
+                )
+            elif offset:
+                query = query.offset(offset)
+            comments = query.limit(limit).all()
             return comments
         except Exception:
             return []
 
     def get_comments_count(self):
         try:
-            count = self.session.query(Comment).count()
-            return count
+            counter = self.read_session.get(Counter, "comments")
+            if counter:
+                return counter.value
+            return self.read_session.query(Comment).count()
         except Exception:
             return 0
 
+    # ---------------- 缓存相关 ----------------
+    def _load(self, model, key):
+        # 用独立的短会话从主库加载，避免把请求会话中的对象脱离出来
+        with self._lookup_session() as lookup:
+            return lookup.get(model, key)
+
+    def _cached_get(self, model, key, version=None):
+        # version 为该表的版本号时只命中同一版本号下缓存的对象；
+        # 未传入时按过期时间和本进程内的失效判断
+        cache_key = (model.__tablename__, key)
+        obj = self._entity_cache.get(cache_key, version)
+        if obj is None:
+            obj = self._load(model, key)
+            self._entity_cache.set(cache_key, obj, version)
+        return obj
+
+    def cache_stats(self):
+        return {
+            "entity": self._entity_cache.stats(),
+            "summary": self._summary_cache.stats(),
+        }
+
+    def clear_caches(self):
+        # 清空实体和汇总缓存，下一次读取直接查询数据库
+        self._entity_cache.clear()
+        self._summary_cache.clear()
+
+    # ---------------- 计数相关 ----------------
+    def _increment_counter(self, name, amount=1):
+        # 在当前事务内原子地累加计数，由调用方提交
+        self.session.execute(
+            update(Counter)
+            .where(Counter.name == name)
+            .values(value=Counter.value + amount)
+        )
+
+    def _bump_version(self, *tables):
+        # 与数据写入在同一事务中递增表版本号，由调用方提交
+        self.session.execute(
+            update(Counter)
+            .where(Counter.name.in_([version_counter(t) for t in tables]))
+            .values(value=Counter.value + 1)
+        )
+
+    def get_table_versions(self, tables):
+        # 一次查询读取多张表的版本号；有表缺少版本号（未升级的库）时返回None
+        names = [version_counter(t) for t in tables]
+        rows = dict(
+            self.read_session.query(Counter.name, Counter.value).filter(
+                Counter.name.in_(names)
+            )
+        )
+        if len(rows) != len(names):
+            return None
+        return [rows[name] for name in names]
+
+    def count_queries(self, budget=None):
+        return QueryCounter(self.engines, budget)
+
+    # ---------------- 读写分离 ----------------
+    @property
+    def engines(self):
+        return [self.engine] + [r.engine for r in self.replicas]
+
+    @property
+    def read_session(self):
+        # 只读查询使用的会话：同一请求内固定使用同一个副本，多次查询看到一致的数据；
+        # 没有可用副本、本请求已提交过写入或调用过use_primary时使用主库
+        local = self._local
+        if (
+            not self.replicas
+            or getattr(local, "wrote", False)
+            or getattr(local, "primary", False)
+        ):
+            return self.session
+        if getattr(local, "replica", None) is None:
+            local.replica = self._choose_replica()
+        return local.replica
+
+    def _choose_replica(self):
+        # 从下一个副本开始轮询，跳过不健康的副本；全部不可用时回到主库
+        start = next(self._replica_turn)
+        for i in range(len(self.replicas)):
+            replica = self.replicas[(start + i) % len(self.replicas)]
+            if replica.is_healthy():
+                return replica.session
+        return self.session
+
+    def _mark_written(self, session):
+        self._local.wrote = True
+
+    def has_written(self):
+        # 当前请求是否向主库提交过写入
+        return getattr(self._local, "wrote", False)
+
+    def use_primary(self):
+        # 当前请求余下的读取都走主库（如用户刚写入，副本可能尚未同步）
+        self._local.primary = True
+
+    # 释放当前线程的会话，连接归还连接池
+    def remove_session(self):
+        self.session.remove()
+        for replica in self.replicas:
+            replica.session.remove()
+        self._local.__dict__.clear()
+
     def close(self):
-        self.session.close()
+        self.remove_session()
+        for engine in self.engines:
+            engine.dispose()
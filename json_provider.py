@@ -0,0 +1,52 @@
+"""
+基于 orjson 的 Flask JSON 序列化：比标准库 json 快数倍，直接输出 UTF-8 字节。
+未安装 orjson 时 init_json_provider 不做任何修改，继续使用 Flask 默认实现。
+"""
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖
+    orjson = None
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """与 DefaultJSONProvider 行为一致，orjson 不支持的类型交给 default 处理"""
+
+    def _options(self, kwargs):
+        # orjson 默认把日期时间输出为 ISO 8601，交给 default 才与 Flask 一样输出 HTTP 日期
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if kwargs.get("indent"):
+            option |= orjson.OPT_INDENT_2
+        if kwargs.get("sort_keys", self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        return option
+
+    def dumps_bytes(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=self._options(kwargs))
+
+    def dumps(self, obj, **kwargs):
+        return self.dumps_bytes(obj, **kwargs).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # 直接使用 orjson 输出的字节，省去一次解码再编码
+        obj = self._prepare_response_obj(args, kwargs)
+        dump_args = {}
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            dump_args["indent"] = 2
+        body = self.dumps_bytes(obj, **dump_args) + b"\n"
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def init_json_provider(app):
+    """已安装 orjson 时替换应用的 JSON 序列化实现，返回是否替换"""
+    if orjson is None:
+        return False
+    app.json = OrjsonProvider(app)
+    # 列表接口数据量大，键排序的开销没有必要
+    app.json.sort_keys = False
+    return True
@@ -0,0 +1,292 @@
+"""
+请求与SQL指标：按接口记录延迟直方图、每个请求的SQL语句数和耗时，
+超过阈值的SQL写入慢查询日志，并以 Prometheus 文本格式在 /metrics 输出。
+Flask 应用用 init_metrics 注册，asgi.py 中的 Quart 应用用 init_async_metrics 注册，
+两者记入同一组指标。
+"""
+
+from flask import Response, request
+from sqlalchemy import event
+import bisect
+import contextvars
+import logging
+import os
+import threading
+import time
+
+# 超过该耗时（毫秒）的SQL记入慢查询日志
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+slow_query_logger = logging.getLogger("slow_query")
+
+
+def _format_labels(names, values, extra=""):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """只增不减的计数，可带标签"""
+
+    kind = "counter"
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        # 无标签的计数从0开始输出
+        self._values = {} if labels else {(): 0}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for label_values, value in items:
+            yield self.name, _format_labels(self.labels, label_values), value
+
+
+class Gauge:
+    """读取时调用函数取当前值，如队列长度"""
+
+    kind = "gauge"
+
+    def __init__(self, name, documentation, func):
+        self.name = name
+        self.documentation = documentation
+        self.func = func
+
+    def samples(self):
+        yield self.name, "", self.func()
+
+
+class Histogram:
+    """累积分桶直方图，可带标签"""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self._values = {}  # 标签值 -> [各桶计数..., 总和, 次数]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            data = self._values.get(label_values)
+            if data is None:
+                data = self._values[label_values] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                data[index] += 1
+            data[-2] += value
+            data[-1] += 1
+
+    def samples(self):
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._values.items())
+        for label_values, data in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, data):
+                cumulative += count
+                labels = _format_labels(self.labels, label_values, f'le="{bound}"')
+                yield self.name + "_bucket", labels, cumulative
+            labels = _format_labels(self.labels, label_values, 'le="+Inf"')
+            yield self.name + "_bucket", labels, data[-1]
+            labels = _format_labels(self.labels, label_values)
+            yield self.name + "_sum", labels, data[-2]
+            yield self.name + "_count", labels, data[-1]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, *args, **kwargs):
+        return self.register(Counter(*args, **kwargs))
+
+    def gauge(self, *args, **kwargs):
+        return self.register(Gauge(*args, **kwargs))
+
+    def histogram(self, *args, **kwargs):
+        return self.register(Histogram(*args, **kwargs))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+request_duration = registry.histogram(
+    "http_request_duration_seconds",
+    "HTTP请求耗时",
+    labels=("endpoint", "method", "status"),
+)
+request_sql_statements = registry.histogram(
+    "http_request_sql_statements",
+    "每个请求执行的SQL语句数",
+    labels=("endpoint",),
+    buckets=COUNT_BUCKETS,
+)
+request_sql_duration = registry.histogram(
+    "http_request_sql_duration_seconds",
+    "每个请求的SQL总耗时",
+    labels=("endpoint",),
+)
+sql_statements_total = registry.counter("sql_statements_total", "执行的SQL语句总数")
+sql_duration_total = registry.counter("sql_duration_seconds_total", "SQL总耗时")
+slow_queries_total = registry.counter(
+    "sql_slow_queries_total", f"耗时超过{SLOW_QUERY_MS:g}ms的SQL语句数"
+)
+
+
+# 当前请求的计时和SQL统计；Flask 按线程、Quart 按协程各自独立
+_request_stats = contextvars.ContextVar("request_stats", default=None)
+
+
+def _start_request(endpoint):
+    _request_stats.set(
+        {
+            "start": time.perf_counter(),
+            "endpoint": endpoint or "unmatched",
+            "status": 500,
+            "sql_statements": 0,
+            "sql_seconds": 0.0,
+        }
+    )
+
+
+def _record_status(response):
+    stats = _request_stats.get()
+    if stats is not None:
+        stats["status"] = response.status_code
+    return response
+
+
+def _finish_request(method):
+    stats = _request_stats.get()
+    if stats is None:
+        return
+    _request_stats.set(None)
+    endpoint = stats["endpoint"]
+    if endpoint == "metrics":
+        return
+    request_duration.observe(
+        time.perf_counter() - stats["start"], endpoint, method, str(stats["status"])
+    )
+    request_sql_statements.observe(stats["sql_statements"], endpoint)
+    request_sql_duration.observe(stats["sql_seconds"], endpoint)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    sql_statements_total.inc()
+    sql_duration_total.inc(amount=elapsed)
+    endpoint = None
+    stats = _request_stats.get()
+    if stats is not None:
+        stats["sql_statements"] += 1
+        stats["sql_seconds"] += elapsed
+        endpoint = stats["endpoint"]
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        slow_queries_total.inc()
+        slow_query_logger.warning(
+            "%.1fms endpoint=%s %s",
+            elapsed * 1000,
+            endpoint,
+            " ".join(statement.split()),
+        )
+
+
+def _handle_error(conn_context):
+    # 出错的语句不会触发 after_cursor_execute，需弹出计时
+    starts = (
+        conn_context.connection.info.get("query_start")
+        if conn_context.connection
+        else None
+    )
+    if starts:
+        starts.pop()
+
+
+def _listen(engines):
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+
+
+def init_metrics(app, *engines):
+    """在 Flask 应用和数据库 engine（主库及只读副本）上注册指标采集，并添加 /metrics 路由"""
+    _listen(engines)
+
+    @app.before_request
+    def start_timer():
+        _start_request(request.endpoint)
+
+    app.after_request(_record_status)
+
+    @app.teardown_request
+    def record_request(exception=None):
+        _finish_request(request.method)
+
+    @app.route("/metrics")
+    def metrics():
+        """Prometheus 指标"""
+        return Response(registry.render(), mimetype="text/plain; version=0.0.4")
+
+    return registry
+
+
+def init_async_metrics(app, *engines):
+    """在 Quart 应用上注册与 init_metrics 相同的指标采集；指标由 Flask 应用的 /metrics 输出。
+    钩子须为协程函数，同步函数会被 Quart 放到线程池执行，读写不到当前请求的统计"""
+    from quart import request as async_request
+
+    _listen(engines)
+
+    @app.before_request
+    async def start_timer():
+        _start_request(async_request.endpoint)
+
+    @app.after_request
+    async def record_status(response):
+        return _record_status(response)
+
+    @app.teardown_request
+    async def record_request(exception=None):
+        _finish_request(async_request.method)
+
+    return registry
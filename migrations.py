@@ -0,0 +1,254 @@
+"""
+数据库表结构版本迁移
+
+用法：
+    python migrations.py upgrade   # 升级到最新版本
+    python migrations.py current   # 查看当前版本
+    python migrations.py rebuild-course-stats  # 按成绩表重算课程汇总
+    python migrations.py archive-term 2023-2   # 把已结束学期的成绩移入归档表
+
+应用进程启动时只会创建缺失的表（DB_INIT_MODE=ensure），不会修改已有的表；
+已有表上新增的索引、约束和数据初始化由这里的迁移按版本号依次执行。
+每个迁移都可重复执行，升级一般在部署时运行一次，之后各进程可使用
+DB_INIT_MODE=skip 跳过启动时的表结构检查。
+"""
+
+import argparse
+import logging
+import sys
+
+from sqlalchemy import create_engine, func, inspect, select, text
+
+from database import (
+    SCHEMA_VERSION,
+    Base,
+    Comment,
+    Counter,
+    Course,
+    CourseStat,
+    DatabaseManager,
+    Grade,
+    GradeArchive,
+    SchemaVersion,
+    VERSIONED_TABLES,
+    conn_str,
+    rebuild_course_stats,
+    version_counter,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _create_index(conn, table, name):
+    # 按名称在已有表上补建模型中声明的索引
+    index = next(i for i in table.indexes if i.name == name)
+    index.create(conn, checkfirst=True)
+
+
+def _duplicates(conn, table, columns):
+    # 列出在 columns 上重复的键，格式化为日志文本；没有重复时返回None
+    column_list = ", ".join(columns)
+    duplicates = conn.execute(
+        text(
+            f"SELECT {column_list}, COUNT(*) FROM {table} "
+            f"GROUP BY {column_list} HAVING COUNT(*) > 1"
+        )
+    ).all()
+    if not duplicates:
+        return None
+    keys = "\n".join(
+        f"    ({', '.join(map(str, row[:-1]))}) x{row[-1]}" for row in duplicates[:20]
+    )
+    more = f"\n    ……共 {len(duplicates)} 组" if len(duplicates) > 20 else ""
+    return keys + more
+
+
+def _ensure_unique(conn, table, name, columns):
+    # 已存在相同列的唯一约束或唯一索引时跳过；
+    # 已有数据中存在重复值时无法建唯一索引，列出重复的键并跳过该约束
+    inspector = inspect(conn)
+    existing = [c["column_names"] for c in inspector.get_unique_constraints(table)]
+    existing += [i["column_names"] for i in inspector.get_indexes(table) if i["unique"]]
+    if list(columns) in existing:
+        return
+    column_list = ", ".join(columns)
+    statement = f"CREATE UNIQUE INDEX {name} ON {table} ({column_list})"
+    duplicates = _duplicates(conn, table, columns)
+    if duplicates:
+        logger.warning(
+            "%s 表中 (%s) 有重复数据，跳过唯一约束 %s：\n%s\n清理重复数据后手动执行：%s",
+            table,
+            column_list,
+            name,
+            duplicates,
+            statement,
+        )
+        return
+    conn.execute(text(statement))
+
+
+def create_missing_tables(conn):
+    Base.metadata.create_all(conn)
+
+
+def add_grade_course_indexes(conn):
+    _create_index(conn, Grade.__table__, "ix_grades_sno_term")
+    _create_index(conn, Grade.__table__, "ix_grades_cno_term")
+    _create_index(conn, Course.__table__, "ix_courses_tno")
+    _ensure_unique(conn, "grades", "uq_grades_sno_cno_term", ["sno", "cno", "term"])
+    _ensure_unique(conn, "courses", "uq_courses_cname", ["cname"])
+
+
+def add_comment_index_and_counter(conn):
+    _create_index(conn, Comment.__table__, "ix_comments_timestamp_id")
+    exists = conn.execute(
+        select(Counter.value).where(Counter.name == "comments")
+    ).first()
+    if not exists:
+        count = conn.execute(select(func.count(Comment.id))).scalar()
+        conn.execute(Counter.__table__.insert().values(name="comments", value=count))
+
+
+def add_table_version_counters(conn):
+    existing = set(conn.execute(select(Counter.name)).scalars())
+    for table in VERSIONED_TABLES:
+        if version_counter(table) not in existing:
+            conn.execute(
+                Counter.__table__.insert().values(name=version_counter(table), value=0)
+            )
+
+
+def add_course_stats(conn):
+    CourseStat.__table__.create(conn, checkfirst=True)
+    rebuild_course_stats(conn)
+
+
+def add_grades_archive(conn):
+    GradeArchive.__table__.create(conn, checkfirst=True)
+
+
+def grades_autoincrement(conn):
+    # SQLite 的整数主键不带 AUTOINCREMENT 时会复用已删除的最大id，
+    # 归档后新成绩与归档成绩id重复，再次归档时主键冲突。
+    # SQLite 不能修改已有表的主键定义，需按模型重建成绩表；其它数据库的自增不复用id
+    if conn.dialect.name != "sqlite":
+        return
+    grades = Grade.__table__
+    sql = conn.execute(
+        text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'grades'")
+    ).scalar()
+    if "AUTOINCREMENT" not in sql.upper():
+        # 重建后的表带唯一约束，已有重复成绩时无法复制
+        duplicates = _duplicates(conn, "grades", ["sno", "cno", "term"])
+        if duplicates:
+            logger.warning(
+                "grades 表中 (sno, cno, term) 有重复数据，跳过成绩表重建，"
+                "归档后新成绩id可能与归档成绩重复：\n%s\n清理重复数据后重新执行迁移",
+                duplicates,
+            )
+            return
+        columns = ", ".join(c.name for c in grades.columns)
+        for index in inspect(conn).get_indexes("grades"):
+            if index["name"]:
+                conn.execute(text(f"DROP INDEX {index['name']}"))
+        conn.execute(text("ALTER TABLE grades RENAME TO grades_old"))
+        grades.create(conn)
+        conn.execute(
+            text(f"INSERT INTO grades ({columns}) SELECT {columns} FROM grades_old")
+        )
+        conn.execute(text("DROP TABLE grades_old"))
+    # 新成绩的id从当前成绩和归档成绩中最大的id之后开始
+    last_id = max(
+        conn.execute(select(func.max(grades.c.id))).scalar() or 0,
+        conn.execute(select(func.max(GradeArchive.id))).scalar() or 0,
+    )
+    conn.execute(text("DELETE FROM sqlite_sequence WHERE name = 'grades'"))
+    conn.execute(
+        text("INSERT INTO sqlite_sequence (name, seq) VALUES ('grades', :seq)"),
+        {"seq": last_id},
+    )
+
+
+# (版本号, 说明, 迁移函数)，按版本号递增追加，不要修改已发布的迁移
+MIGRATIONS = [
+    (1, "创建缺失的表", create_missing_tables),
+    (2, "成绩、课程二级索引及唯一约束", add_grade_course_indexes),
+    (3, "留言时间索引及留言计数", add_comment_index_and_counter),
+    (4, "表版本号计数（ETag）", add_table_version_counters),
+    (5, "课程成绩汇总表", add_course_stats),
+    (6, "成绩归档表", add_grades_archive),
+    (7, "成绩id不复用（SQLite AUTOINCREMENT）", grades_autoincrement),
+]
+
+assert MIGRATIONS[-1][0] == SCHEMA_VERSION, "SCHEMA_VERSION 与迁移列表不一致"
+
+
+def current_version(conn):
+    if not inspect(conn).has_table(SchemaVersion.__tablename__):
+        return 0
+    return conn.execute(select(func.max(SchemaVersion.version))).scalar() or 0
+
+
+def upgrade(engine):
+    # 每个迁移在独立事务中执行并记录版本，失败时停在上一个版本
+    with engine.connect() as conn:
+        version = current_version(conn)
+    applied = []
+    for number, description, migrate in MIGRATIONS:
+        if number <= version:
+            continue
+        with engine.begin() as conn:
+            migrate(conn)
+            SchemaVersion.__table__.create(conn, checkfirst=True)
+            conn.execute(
+                SchemaVersion.__table__.insert().values(
+                    version=number, description=description
+                )
+            )
+        applied.append((number, description))
+    return applied
+
+
+def main():
+    parser = argparse.ArgumentParser(description="数据库表结构版本迁移")
+    parser.add_argument(
+        "command",
+        choices=["upgrade", "current", "rebuild-course-stats", "archive-term"],
+    )
+    parser.add_argument("term", nargs="?", help="archive-term 要归档的学期")
+    parser.add_argument("--url", default=conn_str, help="默认使用 DB_CONN_STRING")
+    args = parser.parse_args()
+    if not args.url:
+        parser.error("未设置 DB_CONN_STRING，请用 --url 指定数据库")
+    if args.command == "archive-term" and not args.term:
+        parser.error("archive-term 需要指定学期")
+
+    engine = create_engine(args.url)
+    if args.command == "current":
+        with engine.connect() as conn:
+            print(f"当前版本: {current_version(conn)}，最新版本: {SCHEMA_VERSION}")
+        return
+    if args.command == "rebuild-course-stats":
+        # 增量维护出现偏差（如直接改库）时使用
+        count = DatabaseManager(args.url, mode="skip").rebuild_course_stats()
+        print(f"已重算 {count} 门课程的成绩汇总")
+        return
+    if args.command == "archive-term":
+        db = DatabaseManager(args.url, mode="skip")
+        success, result = db.archive_term(args.term)
+        db.close()
+        if not success:
+            print(result, file=sys.stderr)
+            return 1
+        print(f"已归档 {result['term']} 学期成绩 {result['archived']} 条")
+        return
+
+    applied = upgrade(engine)
+    for number, description in applied:
+        print(f"已升级到版本 {number}: {description}")
+    if not applied:
+        print(f"已是最新版本 {SCHEMA_VERSION}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())